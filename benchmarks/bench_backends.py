@@ -0,0 +1,91 @@
+"""Side-by-side latency of the Selenium and Playwright backends
+
+Usage: python benchmarks/bench_backends.py [--runs N] [--delay MS] [--backend NAME ...]
+
+Serves benchmarks/site (a local stand-in for bstackdemo.com that renders
+each screen after --delay milliseconds) and runs the shared flow against it
+with local headless browsers. It reports the median duration of every flow
+step and of a bare command round-trip for each backend. Selenium needs
+Chrome, and Playwright needs `playwright install chromium`.
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from demo.backends import BACKENDS, css, launch_local
+from demo.flow import STEPS, FlowConfig, run_flow
+
+SITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "site")
+ROUND_TRIPS = 50
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_site():
+    handler = functools.partial(QuietHandler, directory=SITE)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_backend(name, url, runs):
+    driver = launch_local(name)
+    try:
+        config = FlowConfig(URL=url, DEFAULT_TIMEOUT=10)
+        steps = {step: [] for step, _ in STEPS}
+        for _ in range(runs):
+            for step, seconds in run_flow(driver, config).items():
+                steps[step].append(seconds)
+
+        round_trip = []
+        for _ in range(ROUND_TRIPS):
+            start = time.perf_counter()
+            driver.texts(css("nav a"))
+            round_trip.append(time.perf_counter() - start)
+    finally:
+        driver.quit()
+
+    medians = {step: statistics.median(samples) for step, samples in steps.items()}
+    medians["total"] = sum(medians.values())
+    medians["round trip"] = statistics.median(round_trip)
+    return medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--delay", type=int, default=100, help="render delay of the local site (ms)")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="backend to benchmark (repeatable, default: all)")
+    args = parser.parse_args()
+
+    server = serve_site()
+    url = f"http://127.0.0.1:{server.server_port}/index.html?delay={args.delay}"
+    results = {}
+    try:
+        for name in args.backend or sorted(BACKENDS):
+            try:
+                results[name] = bench_backend(name, url, args.runs)
+            except Exception as e:
+                print(f"{name}: skipped ({type(e).__name__}: {str(e).splitlines()[0]})", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    if not results:
+        sys.exit(1)
+    names = list(results)
+    print(f"{'median (ms)':12}" + "".join(f"{name:>12}" for name in names))
+    for row in next(iter(results.values())):
+        print(f"{row:12}" + "".join(f"{results[name][row] * 1000:12.1f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure CLI startup time for cheap sub-commands
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--budget SECONDS]
+
+Each sub-command is run in a fresh interpreter so that the numbers include
+interpreter start-up and every import the command triggers. The script
+also reports which heavy modules (if any) were imported, since those are
+what blow the budget.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = [
+    ["platforms"],
+    ["platforms", "--json"],
+    ["shard", "1/2"],
+    ["--help"],
+]
+
+HEAVY_MODULES = ["selenium", "playwright", "browserstack_sdk", "webdriver_manager", "pytest"]
+
+PROBE = """
+import contextlib, io, json, sys
+from demo.cli import main
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        main(json.loads(sys.argv[1]))
+    except SystemExit:
+        pass
+print(json.dumps([m for m in json.loads(sys.argv[2]) if m in sys.modules]))
+"""
+
+
+def time_command(command, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def heavy_imports(argv):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(argv), json.dumps(HEAVY_MODULES)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=0.5,
+                        help="fail if the median of any command exceeds this (seconds)")
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_command([sys.executable, "-c", "pass"], args.runs))
+    print(f"{'bare interpreter':24} median {baseline * 1000:7.1f} ms")
+
+    over_budget = False
+    for argv in COMMANDS:
+        samples = time_command([sys.executable, "-m", "demo", *argv], args.runs)
+        median = statistics.median(samples)
+        heavy = heavy_imports(argv)
+        over_budget |= median > args.budget or bool(heavy)
+        print(f"{' '.join(argv):24} median {median * 1000:7.1f} ms  "
+              f"max {max(samples) * 1000:7.1f} ms  heavy imports: {', '.join(heavy) or 'none'}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
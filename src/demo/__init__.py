@@ -1,2 +1,3 @@
-def main() -> None:
-    print("Hello from selenium-browserstack-demo-git!")
+from demo.cli import main
+
+__all__ = ["main"]
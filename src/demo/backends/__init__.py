@@ -0,0 +1,30 @@
+"""Browser backends the flow can run on
+
+Backends are imported on demand so selecting one never loads the other's
+(heavy) client library.
+"""
+from importlib import import_module
+
+from demo.backends.base import Driver, Locator, css, link, text, xpath
+
+BACKENDS = {
+    "selenium": "demo.backends.selenium_backend",
+    "playwright": "demo.backends.playwright_backend",
+}
+DEFAULT_BACKEND = "selenium"
+
+
+def backend_module(name: str):
+    try:
+        return import_module(BACKENDS[name])
+    except KeyError:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}") from None
+
+
+def launch_local(name: str, headless: bool = True) -> Driver:
+    """Start a local browser session on the given backend"""
+    return backend_module(name).launch_local(headless=headless)
+
+
+__all__ = ["BACKENDS", "DEFAULT_BACKEND", "Driver", "Locator", "backend_module",
+           "css", "launch_local", "link", "text", "xpath"]
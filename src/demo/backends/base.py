@@ -0,0 +1,90 @@
+"""Backend-neutral browser driver interface used by the test flow"""
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+from demo.resources import HEAVY_OPERATIONS
+
+# Locators are (strategy, value) pairs, mirroring Selenium's (By, value) tuples.
+# Only CSS and XPath are supported so both backends resolve them identically.
+Locator = Tuple[str, str]
+CSS = "css"
+XPATH = "xpath"
+
+
+def css(selector: str) -> Locator:
+    return (CSS, selector)
+
+
+def xpath(expression: str) -> Locator:
+    return (XPATH, expression)
+
+
+def text(value: str) -> Locator:
+    """Any element whose own text is exactly `value`"""
+    return xpath(f"//*[text()='{value}']")
+
+
+def link(value: str) -> Locator:
+    """A link whose visible text is `value`"""
+    return xpath(f"//a[normalize-space()='{value}']")
+
+
+class Driver(ABC):
+    """Minimal set of browser operations the flow needs
+
+    Timeouts are in seconds. Every wait raises `TimeoutError` when it
+    expires so callers do not depend on backend-specific exceptions.
+    """
+    name = "abstract"
+
+    @abstractmethod
+    def open(self, url: str, timeout: float) -> None:
+        """Navigate to url and wait up to `timeout` for the page load"""
+
+    @abstractmethod
+    def click(self, locator: Locator, timeout: float) -> None:
+        """Wait for the element to be clickable and click it"""
+
+    @abstractmethod
+    def click_nth(self, locator: Locator, index: int, timeout: float) -> None:
+        """Wait for matches to appear and click the index-th one"""
+
+    @abstractmethod
+    def count(self, locator: Locator, timeout: float) -> int:
+        """Wait for at least one match and return the number of matches"""
+
+    @abstractmethod
+    def is_visible(self, locator: Locator, timeout: float) -> bool:
+        """Wait for the element to be present and report whether it is displayed"""
+
+    @abstractmethod
+    def texts(self, locator: Locator) -> List[str]:
+        """Visible text of every current match, without waiting"""
+
+    @abstractmethod
+    def run_script(self, script: str, *args):
+        """Evaluate a JavaScript function body (`return ...`) in the page"""
+
+    @abstractmethod
+    def quit(self) -> None:
+        """End the session and release the browser"""
+
+    def cancel(self) -> None:
+        """End the session from any thread, e.g. the circuit breaker's watcher
+
+        A wait blocked in the owning thread should fail promptly afterwards.
+        """
+        self.quit()
+
+    # Screenshots materialise a large payload, so they share a machine-wide
+    # concurrency cap in lean mode (see demo.resources).
+
+    def screenshot(self, path: str) -> str:
+        """Save a screenshot straight to `path` without keeping the image in memory"""
+        with HEAVY_OPERATIONS.slot():
+            self._screenshot(path)
+        return path
+
+    @abstractmethod
+    def _screenshot(self, path: str) -> None:
+        """Write a PNG screenshot of the viewport to path"""
@@ -0,0 +1,129 @@
+"""Playwright implementation of the driver interface
+
+Playwright keeps a single persistent connection to the browser and waits
+for actionability on the browser side, so there is no client-side polling
+between commands.
+"""
+import threading
+from typing import List
+
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import Page
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from demo.backends.base import Driver, Locator
+
+
+def _selector(locator: Locator) -> str:
+    strategy, value = locator
+    return f"{strategy}={value}"
+
+
+def _ms(timeout: float) -> float:
+    return timeout * 1000
+
+
+class PlaywrightDriver(Driver):
+    """Wraps a Playwright page; `close` is called on quit to tear down what owns it"""
+    name = "playwright"
+
+    def __init__(self, page: Page, close=None):
+        self.page = page
+        self._close = close
+        self._cancelled = threading.Event()
+
+    def _check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise PlaywrightError("Session was cancelled")
+
+    def _locator(self, locator: Locator):
+        self._check_cancelled()
+        return self.page.locator(_selector(locator))
+
+    def _timeout_error(self, timeout: float, locator: Locator, error: Exception):
+        return TimeoutError(f"Timed out after {timeout}s waiting for {locator}: {error}")
+
+    def open(self, url: str, timeout: float) -> None:
+        self._check_cancelled()
+        try:
+            self.page.goto(url, timeout=_ms(timeout))
+        except PlaywrightTimeoutError as e:
+            raise TimeoutError(f"Timed out after {timeout}s loading {url}: {e}") from None
+
+    def click(self, locator: Locator, timeout: float) -> None:
+        try:
+            self._locator(locator).first.click(timeout=_ms(timeout))
+        except PlaywrightTimeoutError as e:
+            raise self._timeout_error(timeout, locator, e) from None
+
+    def click_nth(self, locator: Locator, index: int, timeout: float) -> None:
+        try:
+            self._locator(locator).nth(index).click(timeout=_ms(timeout))
+        except PlaywrightTimeoutError as e:
+            raise self._timeout_error(timeout, locator, e) from None
+
+    def count(self, locator: Locator, timeout: float) -> int:
+        matches = self._locator(locator)
+        try:
+            matches.first.wait_for(state="attached", timeout=_ms(timeout))
+        except PlaywrightTimeoutError as e:
+            raise self._timeout_error(timeout, locator, e) from None
+        return matches.count()
+
+    def is_visible(self, locator: Locator, timeout: float) -> bool:
+        element = self._locator(locator).first
+        try:
+            element.wait_for(state="attached", timeout=_ms(timeout))
+        except PlaywrightTimeoutError as e:
+            raise self._timeout_error(timeout, locator, e) from None
+        return element.is_visible()
+
+    def texts(self, locator: Locator) -> List[str]:
+        return self._locator(locator).all_inner_texts()
+
+    def run_script(self, script: str, *args):
+        self._check_cancelled()
+        return self.page.evaluate(f"(args) => (function() {{ {script} }}).apply(null, args)", list(args))
+
+    def quit(self) -> None:
+        if self._close is not None:
+            self._close()
+        else:
+            self.page.close()
+
+    def cancel(self) -> None:
+        """Cancel the session from any thread
+
+        The sync API only works on the thread that owns the page; anywhere else
+        it raises greenlet.error. So this sets a flag the owner checks before
+        every Playwright call, which then fails. To also interrupt a wait the
+        owner is blocked in, the page close is handed to the owner's event loop
+        through Playwright's private `_loop` and `_impl_obj`. If a Playwright
+        upgrade removes those, only the flag is left: the blocked wait then runs
+        until its own timeout.
+        """
+        self._cancelled.set()
+        loop = getattr(self.page, "_loop", None)
+        close = getattr(getattr(self.page, "_impl_obj", None), "close", None)
+        if loop is None or close is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(lambda: loop.create_task(close()))
+
+    def _screenshot(self, path: str) -> None:
+        self._check_cancelled()
+        self.page.screenshot(path=path)
+
+
+def launch_local(headless: bool = True, browser: str = "chromium") -> PlaywrightDriver:
+    """Start a local Playwright browser, mainly for benchmarks"""
+    from playwright.sync_api import sync_playwright
+
+    playwright = sync_playwright().start()
+    instance = getattr(playwright, browser).launch(headless=headless)
+    page = instance.new_page()
+
+    def close():
+        instance.close()
+        playwright.stop()
+
+    return PlaywrightDriver(page, close=close)
@@ -0,0 +1,110 @@
+"""Selenium implementation of the driver interface"""
+from typing import List
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from demo.backends.base import CSS, XPATH, Driver, Locator
+from demo.resources import lean_mode, track_element
+
+_BY = {CSS: By.CSS_SELECTOR, XPATH: By.XPATH}
+
+# Resolves a locator to `nodes` in the page; the lean-mode scripts below build on it
+# so a wait or lookup returns plain values (or one element) instead of a WebElement per match
+_MATCHES = """
+const [strategy, value] = arguments;
+let nodes;
+if (strategy === 'css') {
+    nodes = Array.from(document.querySelectorAll(value));
+} else {
+    const result = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    nodes = Array.from({length: result.snapshotLength}, (_, i) => result.snapshotItem(i));
+}
+"""
+_TEXTS_SCRIPT = _MATCHES + "return nodes.map(node => node.innerText);"
+_COUNT_SCRIPT = _MATCHES + "return nodes.length;"
+_NTH_SCRIPT = _MATCHES + "return nodes[arguments[2]] || null;"
+
+
+def _by(locator: Locator):
+    strategy, value = locator
+    return (_BY[strategy], value)
+
+
+class SeleniumDriver(Driver):
+    """Wraps a Selenium WebDriver (local or remote)"""
+    name = "selenium"
+
+    def __init__(self, webdriver: WebDriver, poll_frequency: float = 0.5):
+        self.webdriver = webdriver
+        self.poll_frequency = poll_frequency
+        self._page_load_timeout = None
+
+    def _wait(self, timeout: float, condition, description: str):
+        try:
+            return WebDriverWait(self.webdriver, timeout, self.poll_frequency).until(condition)
+        except TimeoutException:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}") from None
+
+    def open(self, url: str, timeout: float) -> None:
+        # Only another round trip when the step's timeout changes
+        if timeout != self._page_load_timeout:
+            self.webdriver.set_page_load_timeout(timeout)
+            self._page_load_timeout = timeout
+        try:
+            self.webdriver.get(url)
+        except TimeoutException:
+            raise TimeoutError(f"Timed out after {timeout}s loading {url}") from None
+
+    def click(self, locator: Locator, timeout: float) -> None:
+        element = self._wait(timeout, EC.element_to_be_clickable(_by(locator)), f"{locator} to be clickable")
+        track_element(element).click()
+
+    def click_nth(self, locator: Locator, index: int, timeout: float) -> None:
+        if lean_mode():
+            # Only the element to click crosses the wire, still clicked natively
+            element = self._wait(timeout, lambda d: d.execute_script(_NTH_SCRIPT, *locator, index),
+                                 f"{locator}[{index}]")
+        else:
+            element = self._wait(timeout, EC.presence_of_all_elements_located(_by(locator)),
+                                 str(locator))[index]
+        track_element(element).click()
+
+    def count(self, locator: Locator, timeout: float) -> int:
+        if lean_mode():
+            # Counted in the page; a count of 0 keeps the wait polling
+            return self._wait(timeout, lambda d: d.execute_script(_COUNT_SCRIPT, *locator), str(locator))
+        elements = self._wait(timeout, EC.presence_of_all_elements_located(_by(locator)), str(locator))
+        return len([track_element(element) for element in elements])
+
+    def is_visible(self, locator: Locator, timeout: float) -> bool:
+        element = self._wait(timeout, EC.presence_of_element_located(_by(locator)), str(locator))
+        return track_element(element).is_displayed()
+
+    def texts(self, locator: Locator) -> List[str]:
+        if lean_mode():
+            # One round trip returning plain strings instead of a WebElement per match
+            return self.webdriver.execute_script(_TEXTS_SCRIPT, *locator)
+        return [track_element(element).text for element in self.webdriver.find_elements(*_by(locator))]
+
+    def run_script(self, script: str, *args):
+        return self.webdriver.execute_script(script, *args)
+
+    def quit(self) -> None:
+        self.webdriver.quit()
+
+    def _screenshot(self, path: str) -> None:
+        self.webdriver.save_screenshot(path)
+
+
+def launch_local(headless: bool = True) -> SeleniumDriver:
+    """Start a local Chrome session, mainly for benchmarks"""
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    return SeleniumDriver(webdriver.Chrome(options=options))
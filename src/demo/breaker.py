@@ -0,0 +1,182 @@
+"""Build-wide circuit breaker for systemic failures
+
+When credentials, the target site or the tunnel break, every worker fails
+the same way, but each one only finds out after its own waits and retries.
+Workers (threads or the per-platform processes started by the SDK) append
+their failures to a shared JSON-lines file. Once the same failure has hit K
+distinct workers within a time window, the breaker trips. Failures are the
+same if they have the same root exception class, flow step and message
+(with numbers masked). Two platforms timing out on different steps are not
+a systemic failure. Assertion failures are never recorded: they are test
+results, not infrastructure problems.
+Workers then stop picking up tests, live sessions are cancelled in parallel,
+and `demo run` prints one root-cause report instead of N timeouts.
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+ENV_VAR = "DEMO_BREAKER_FILE"
+DEFAULT_PATH = os.path.join("log", "breaker.jsonl")
+TRIPPED_EXIT_CODE = 3
+
+
+@dataclass
+class Trip:
+    """Why the breaker opened"""
+    error: str
+    message: str
+    workers: List[str]
+    first_seen: float
+    last_seen: float
+    step: Optional[str] = None
+
+    def report(self) -> str:
+        return "\n".join([
+            "=" * 80,
+            "BUILD CANCELLED: systemic failure detected",
+            f"Root cause: {self.error}: {self.message}"
+            + (f" (in step {self.step!r})" if self.step else ""),
+            f"Seen on {len(self.workers)} workers within "
+            f"{self.last_seen - self.first_seen:.0f}s: {', '.join(self.workers)}",
+            "=" * 80,
+        ])
+
+
+def root_exception(error: BaseException) -> BaseException:
+    """Follow explicit causes down to the original error"""
+    seen = set()
+    while error.__cause__ is not None and id(error) not in seen:
+        seen.add(id(error))
+        error = error.__cause__
+    return error
+
+
+def signature(error: str, step: Optional[str], message: str) -> str:
+    """What makes two failures the same; numbers (timeouts, ports, ids) are masked"""
+    return f"{error}|{step or ''}|{re.sub(r'[0-9]+', '#', message)}"
+
+
+class CircuitBreaker:
+    """Failure log shared by every worker of one build"""
+
+    def __init__(self, path: str = DEFAULT_PATH, threshold: int = 2, window: float = 300,
+                 poll_interval: float = 1.0):
+        self.path = path
+        self.threshold = threshold
+        self.window = window
+        self.poll_interval = poll_interval
+        self._drivers: Dict[int, object] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> Optional["CircuitBreaker"]:
+        """Breaker for the current build, if `demo run` (or the user) enabled one"""
+        path = os.environ.get(ENV_VAR)
+        if not path:
+            return None
+        return cls(path,
+                   threshold=int(os.environ.get("DEMO_BREAKER_THRESHOLD", 2)),
+                   window=float(os.environ.get("DEMO_BREAKER_WINDOW", 300)))
+
+    def reset(self) -> None:
+        """Start a new build with an empty failure log"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        open(self.path, "w").close()
+
+    def record_failure(self, worker: str, error: BaseException) -> None:
+        """Log a worker's failure; assertion failures (the product misbehaving) are ignored"""
+        root = root_exception(error)
+        if isinstance(root, AssertionError):
+            return
+        message = (str(root).strip().splitlines() or [""])[0][:200]
+        # FlowError (demo.flow) names the step; the cause carries the root class
+        step = getattr(error, "step", None)
+        line = json.dumps({"time": time.time(), "worker": worker, "error": type(root).__name__,
+                           "step": step, "message": message,
+                           "signature": signature(type(root).__name__, step, message)})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # One short O_APPEND write per event, so concurrent writers never interleave
+        with open(self.path, "a") as fh:
+            fh.write(line + "\n")
+
+    def _events(self) -> List[Dict]:
+        try:
+            with open(self.path) as fh:
+                lines = fh.readlines()
+        except OSError:
+            return []
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue  # partially written line
+        return sorted(events, key=lambda event: event["time"])
+
+    def trip(self) -> Optional[Trip]:
+        """The earliest window in which one failure hit `threshold` workers, if any"""
+        events = self._events()
+        for i, first in enumerate(events):
+            workers: Dict[str, Dict] = {}
+            for event in events[i:]:
+                if event["time"] - first["time"] > self.window:
+                    break
+                if event["signature"] == first["signature"]:
+                    workers.setdefault(event["worker"], event)
+                if len(workers) >= self.threshold:
+                    return Trip(first["error"], first["message"], list(workers),
+                                first["time"], event["time"], first.get("step"))
+        return None
+
+    # Live session handling
+
+    def register(self, driver) -> None:
+        """Track a live session so it can be quit as soon as the breaker trips"""
+        with self._lock:
+            self._drivers[id(driver)] = driver
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="circuit-breaker",
+                                                 daemon=True)
+                self._watcher.start()
+
+    def unregister(self, driver) -> None:
+        with self._lock:
+            self._drivers.pop(id(driver), None)
+
+    def cancel(self) -> int:
+        """Cancel every registered session in parallel; returns how many were cancelled
+
+        Drivers are cancelled through `Driver.cancel`, which is safe to call from
+        the watcher thread; plain objects with only `quit` are quit instead.
+        """
+        with self._lock:
+            drivers = list(self._drivers.values())
+            self._drivers.clear()
+        if drivers:
+            with ThreadPoolExecutor(max_workers=len(drivers)) as pool:
+                list(pool.map(_cancel_quietly, drivers))
+        return len(drivers)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self.trip() is not None:
+                self.cancel()
+                return
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+def _cancel_quietly(driver) -> None:
+    try:
+        getattr(driver, "cancel", driver.quit)()
+    except Exception:
+        pass
@@ -0,0 +1,308 @@
+"""Command line entry point for the demo suite
+
+Only the standard library is imported at module level so that cheap
+sub-commands (listing or sharding the matrix) stay fast; Selenium,
+Playwright and the BrowserStack SDK are only loaded by the processes
+that actually drive browsers.
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+# Only the browser tests go through the SDK, which repeats them once per platform;
+# the unit tests under tests/ run once with plain pytest
+DEFAULT_TESTS = os.path.join("tests", "test_bstackdemo.py")
+DEFAULT_JUNIT = os.path.join("log", "results.xml")
+
+
+def _selected_platforms(args):
+    from demo import platforms as matrix
+
+    config = matrix.load_config(args.config)
+    selected = matrix.platforms_from_config(config)
+    if getattr(args, "shard", None):
+        selected = matrix.select_shard(selected, *matrix.parse_shard(args.shard))
+    if getattr(args, "platform", None):
+        selected = matrix.select_by_name(selected, args.platform)
+    return config, selected
+
+
+def cmd_platforms(args) -> int:
+    """List the platform matrix"""
+    _, selected = _selected_platforms(args)
+    if args.json:
+        import json
+
+        print(json.dumps([{"index": p.index, "name": p.name, "mobile": p.is_mobile,
+                           "capabilities": p.capabilities} for p in selected], indent=2))
+    else:
+        for p in selected:
+            print(f"{p.index}\t{'mobile' if p.is_mobile else 'desktop'}\t{p.name}")
+    return 0
+
+
+def cmd_shard(args) -> int:
+    """Print (and optionally write a config for) one shard of the matrix"""
+    from demo import platforms as matrix
+
+    config, selected = _selected_platforms(args)
+    for p in selected:
+        print(p.name)
+    if args.output:
+        matrix.write_config(config, selected, args.output)
+    return 0
+
+
+def cmd_run(args) -> int:
+    """Run the test suite against the selected platforms"""
+    import subprocess
+
+    from demo import platforms as matrix
+    from demo.breaker import ENV_VAR, TRIPPED_EXIT_CODE, CircuitBreaker
+    from demo.envcache import using_current_env
+    from demo.resources import HEAVY_LIMIT_ENV_VAR, LEAN_ENV_VAR, RESOURCES_ENV_VAR, summarise
+
+    config, selected = _selected_platforms(args)
+    if not selected:
+        print("No platforms selected", file=sys.stderr)
+        return 2
+
+    env = dict(os.environ)
+    tunnel = local_identifier = None
+    use_tunnel = config.get("browserstackLocal", False) if args.tunnel is None else args.tunnel
+    if use_tunnel and not args.no_sdk:
+        from demo.tunnel import TunnelError, TunnelManager
+
+        tunnel = TunnelManager(idle_timeout=args.tunnel_idle_timeout)
+        try:
+            lease = tunnel.acquire()
+        except TunnelError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        local_identifier = lease.local_identifier
+        print(lease.summary())
+    # Always export the config the platforms were read from: the SDK and conftest
+    # would otherwise fall back to browserstack.yml even with --config
+    env["BROWSERSTACK_CONFIG_FILE"] = os.path.abspath(matrix.config_path(args.config))
+    # Files written per invocation are named after the shard, so concurrent shards don't clash
+    suffix = args.shard.replace("/", "-of-") if args.shard else "run"
+    if local_identifier or args.shard or args.platform:
+        derived = os.path.join("log", f"browserstack.{suffix}.yml")
+        env["BROWSERSTACK_CONFIG_FILE"] = os.path.abspath(matrix.write_config(
+            config, selected, derived, local_identifier=local_identifier))
+
+    pytest_args = [args.tests, f"--junitxml={args.junitxml}", f"--backend={args.backend}"]
+    if args.step_history:
+        pytest_args.append(f"--step-history={args.step_history}")
+    if args.fingerprint_cache:
+        pytest_args.append(f"--fingerprint-cache={args.fingerprint_cache}")
+    pytest_args.extend(args.pytest_args)
+    if args.no_sdk:
+        command = [sys.executable, "-m", "pytest", *pytest_args]
+    else:
+        command = ["browserstack-sdk", "pytest", *pytest_args]
+
+    resources_file = args.resources_file or os.path.join("log", f"resources.{suffix}.jsonl")
+    if os.path.exists(resources_file):
+        os.unlink(resources_file)
+    env[RESOURCES_ENV_VAR] = resources_file
+    if args.lean:
+        env[LEAN_ENV_VAR] = "1"
+        env[HEAVY_LIMIT_ENV_VAR] = str(args.heavy_ops_limit)
+
+    breaker = CircuitBreaker(args.breaker_file, threshold=args.breaker_threshold,
+                             window=args.breaker_window)
+    breaker.reset()
+    env.update({ENV_VAR: breaker.path, "DEMO_BREAKER_THRESHOLD": str(breaker.threshold),
+                "DEMO_BREAKER_WINDOW": str(breaker.window)})
+
+    print(f"Running with {args.backend} on {len(selected)} platform(s): "
+          f"{', '.join(p.name for p in selected)}")
+    try:
+        # Keep `demo bootstrap --keep` in concurrent builds from pruning the environment we run from
+        with using_current_env():
+            returncode = subprocess.call(command, env=env)
+    finally:
+        if tunnel is not None:
+            tunnel.release()
+
+    for line in summarise(resources_file):
+        print(line)
+
+    trip = breaker.trip()
+    if trip is not None:
+        print(trip.report(), file=sys.stderr)
+        return TRIPPED_EXIT_CODE
+    return returncode
+
+
+def cmd_report(args) -> int:
+    """Summarise a JUnit XML report produced by `run`"""
+    import xml.etree.ElementTree as ET
+
+    try:
+        root = ET.parse(args.junitxml).getroot()
+    except (OSError, ET.ParseError) as e:
+        print(f"Could not read report {args.junitxml}: {e}", file=sys.stderr)
+        return 2
+
+    counts = {"passed": 0, "failed": 0, "skipped": 0}
+    for case in root.iter("testcase"):
+        name = "::".join(filter(None, [case.get("classname"), case.get("name")]))
+        if case.find("failure") is not None or case.find("error") is not None:
+            status = "failed"
+        elif case.find("skipped") is not None:
+            status = "skipped"
+        else:
+            status = "passed"
+        counts[status] += 1
+        print(f"{status.upper():8} {name} ({float(case.get('time') or 0):.1f}s)")
+
+    print(", ".join(f"{n} {status}" for status, n in counts.items()))
+    return 1 if counts["failed"] else 0
+
+
+def cmd_bootstrap(args) -> int:
+    """Build or reuse the cached environment for uv.lock"""
+    from demo import envcache
+
+    try:
+        result = envcache.bootstrap(args.lockfile, cache_dir=args.cache_dir, link=args.link)
+    except envcache.BuildError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(result.summary())
+    if args.keep is not None:
+        for path in envcache.prune(args.cache_dir, keep=args.keep):
+            print(f"pruned {path}")
+    if args.metrics:
+        import json
+
+        with open(args.metrics, "w") as fh:
+            json.dump(vars(result), fh)
+    return 0
+
+
+def cmd_timeouts(args) -> int:
+    """Show the adaptive step timeouts learned from recorded durations"""
+    from demo.timeouts import DurationHistory, TimeoutModel
+
+    model = TimeoutModel(DurationHistory(args.history))
+    for platform, steps in sorted(model.history.samples.items()):
+        for step in steps:
+            note = " (last run timed out)" if model.history.timed_out(platform, step) else ""
+            print(f"{platform}\t{step}\t{len(model.history.get(platform, step))} samples\t"
+                  f"{model.timeout(platform, step):.1f}s{note}")
+    return 0
+
+
+def cmd_tunnel(args) -> int:
+    """Inspect or stop the shared BrowserStack Local tunnel"""
+    from demo.tunnel import TunnelManager
+
+    manager = TunnelManager(state_dir=args.state_dir, idle_timeout=args.idle_timeout)
+    if args.action == "status":
+        state = manager.status()
+        if state is None:
+            print("no tunnel running")
+            return 1
+        print(f"tunnel {state['local_identifier']} pid {state['pid']} "
+              f"{'healthy' if state['healthy'] else 'DOWN'}, {len(state['holders'])} holder(s), "
+              f"idle {state['idle_seconds']:.0f}s, startup took {state['startup_seconds']:.1f}s")
+        return 0 if state["healthy"] else 1
+    if args.action == "reap":
+        stopped = manager.reap(wait=args.wait)
+    else:
+        stopped = manager.stop()
+    print("tunnel stopped" if stopped else "tunnel left running")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="demo", description=__doc__.splitlines()[0])
+    parser.add_argument("--config", help="BrowserStack config file (default: browserstack.yml)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("platforms", help=cmd_platforms.__doc__)
+    p.add_argument("--json", action="store_true", help="print full capabilities as JSON")
+    p.set_defaults(func=cmd_platforms)
+
+    p = sub.add_parser("shard", help=cmd_shard.__doc__)
+    p.add_argument("shard", help="shard to select, as 'k/n' (1-based)")
+    p.add_argument("-o", "--output", help="write a BrowserStack config for this shard")
+    p.set_defaults(func=cmd_shard)
+
+    p = sub.add_parser("run", help=cmd_run.__doc__)
+    p.add_argument("--shard", help="only run shard 'k/n' of the matrix")
+    p.add_argument("--platform", action="append",
+                   help="only run platforms whose name contains this text (repeatable)")
+    p.add_argument("--tests", default=DEFAULT_TESTS, help="browser test path passed to pytest (default: %(default)s)")
+    p.add_argument("--backend", choices=["selenium", "playwright"], default="selenium",
+                   help="browser automation backend for the flow")
+    p.add_argument("--step-history",
+                   help="step duration history for adaptive timeouts; keep it outside the "
+                        "workspace so it survives between builds")
+    p.add_argument("--junitxml", default=DEFAULT_JUNIT, help="where to write the JUnit report")
+    p.add_argument("--no-sdk", action="store_true",
+                   help="run plain pytest instead of going through browserstack-sdk")
+    p.add_argument("--fingerprint-cache",
+                   help="skip verification steps whose page region matches a known-good DOM "
+                        "fingerprint stored in this file (off by default; only worth it where "
+                        "the full checks cost more than one script call)")
+    p.add_argument("--breaker-file", default=os.path.join("log", "breaker.jsonl"),
+                   help="failure log shared by all workers of this run")
+    p.add_argument("--breaker-threshold", type=int, default=2,
+                   help="cancel the build once this many workers fail with the same error")
+    p.add_argument("--breaker-window", type=float, default=300,
+                   help="only correlate failures this many seconds apart")
+    p.add_argument("--lean", action="store_true",
+                   help="release transient objects eagerly and cap concurrent "
+                        "screenshots on this machine")
+    p.add_argument("--heavy-ops-limit", type=int, default=2,
+                   help="with --lean, how many heavy operations may run at once")
+    p.add_argument("--resources-file",
+                   help="per-worker resource accounting, replaced on every run "
+                        "(default: log/resources.<shard>.jsonl)")
+    p.add_argument("--tunnel", action=argparse.BooleanOptionalAction, default=None,
+                   help="share a managed BrowserStack Local tunnel "
+                        "(default: the config's browserstackLocal setting)")
+    p.add_argument("--tunnel-idle-timeout", type=float, default=600,
+                   help="keep the tunnel warm this many seconds after the run")
+    p.add_argument("pytest_args", nargs=argparse.REMAINDER,
+                   help="extra arguments passed through to pytest")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("report", help=cmd_report.__doc__)
+    p.add_argument("junitxml", nargs="?", default=DEFAULT_JUNIT)
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("bootstrap", help=cmd_bootstrap.__doc__)
+    p.add_argument("--lockfile", default="uv.lock")
+    p.add_argument("--cache-dir", help="environment cache (default: $DEMO_ENV_CACHE or ~/.cache/demo-envs)")
+    p.add_argument("--link", help="symlink this path (e.g. .venv) to the cached environment")
+    p.add_argument("--keep", type=int, help="prune the cache down to this many environments")
+    p.add_argument("--metrics", help="write cache hit/miss and setup time as JSON to this file")
+    p.set_defaults(func=cmd_bootstrap)
+
+    p = sub.add_parser("tunnel", help=cmd_tunnel.__doc__)
+    p.add_argument("--state-dir", help="tunnel state (default: $DEMO_TUNNEL_DIR or ~/.cache/demo-tunnel)")
+    p.add_argument("--idle-timeout", type=float, default=600)
+    p.add_argument("action", choices=["status", "stop", "reap"])
+    p.add_argument("--wait", action="store_true", help="reap: wait for the idle timeout to expire")
+    p.set_defaults(func=cmd_tunnel)
+
+    p = sub.add_parser("timeouts", help=cmd_timeouts.__doc__)
+    p.add_argument("--history", default=os.path.join("log", "step-durations.json"))
+    p.set_defaults(func=cmd_timeouts)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
@@ -0,0 +1,212 @@
+"""Content-addressed cache of virtual environments keyed by uv.lock
+
+CI used to recreate the venv from scratch on every build. Instead the
+environment is built once per distinct lockfile (plus Python version and
+platform) into a shared cache directory and reused by later builds.
+Virtualenvs are not relocatable, so environments are built in place under
+an exclusive file lock and only marked complete once `uv sync` succeeds.
+
+Pruning never removes an environment that is being built, or that a
+`demo run` is running from: the run holds a shared lock on the
+environment for its whole duration. Anything else started from a cached
+environment (e.g. a plain pytest run) is only protected by having been
+used recently, since bootstrap marks the environment as used and prune
+keeps the most recently used ones.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from demo.state import user_cache_dir
+
+COMPLETE_MARKER = ".complete"
+# Held exclusively while an environment is built, shared while a run uses it
+BUILD_LOCK = ".lock"
+IN_USE_LOCK = ".in-use"
+DEFAULT_LOCKFILE = "uv.lock"
+DEFAULT_PYTHON_VERSION_FILE = ".python-version"
+
+
+class BuildError(RuntimeError):
+    """Building an environment failed"""
+
+
+@dataclass
+class BootstrapResult:
+    """Outcome of a bootstrap call"""
+    key: str
+    path: str
+    hit: bool
+    seconds: float
+
+    def summary(self) -> str:
+        status = "hit" if self.hit else "miss"
+        return f"env cache {status}: {self.key} -> {self.path} ({self.seconds:.1f}s)"
+
+
+def default_cache_dir() -> str:
+    return user_cache_dir("demo-envs", "DEMO_ENV_CACHE")
+
+
+def cache_key(lockfile: str = DEFAULT_LOCKFILE,
+              python_version_file: str = DEFAULT_PYTHON_VERSION_FILE) -> str:
+    """Hash of everything that determines the contents of the environment"""
+    digest = hashlib.sha256()
+    with open(lockfile, "rb") as fh:
+        digest.update(fh.read())
+    if os.path.exists(python_version_file):
+        with open(python_version_file, "rb") as fh:
+            digest.update(fh.read().strip())
+    digest.update(f"{sys.platform}-{platform.machine()}".encode())
+    return digest.hexdigest()[:16]
+
+
+def env_python(env_path: str) -> str:
+    return os.path.join(env_path, "bin", "python")
+
+
+def usable(env_path: str) -> bool:
+    """The environment is complete and its interpreter still runs
+
+    The key only covers the .python-version text, so a patch upgrade or removal
+    of the interpreter uv picked leaves a venv whose python symlink dangles.
+    """
+    if not os.path.exists(os.path.join(env_path, COMPLETE_MARKER)):
+        return False
+    try:
+        return subprocess.run([env_python(env_path), "-c", ""], stdin=subprocess.DEVNULL,
+                              capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+@contextmanager
+def _lock_file(path: str, operation: int):
+    """Hold a flock on `path`; yields False if `operation` is non-blocking and it is taken
+
+    prune() deletes lock files, so after waiting, re-check that the file on disk
+    is still the one that was locked and start over if it is not.
+    """
+    while True:
+        with open(path, "w") as lock:
+            try:
+                fcntl.flock(lock, operation)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if os.path.samestat(current, os.fstat(lock.fileno())):
+                yield True
+                return
+
+
+def _env_lock(env_path: str, blocking: bool = True):
+    """Hold the environment's build lock exclusively"""
+    return _lock_file(env_path + BUILD_LOCK, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+
+
+def current_env() -> Optional[str]:
+    """The cached environment this interpreter runs from, if it is one"""
+    prefix = os.path.realpath(sys.prefix)
+    return prefix if os.path.exists(os.path.join(prefix, COMPLETE_MARKER)) else None
+
+
+@contextmanager
+def using_current_env():
+    """Keep prune() away from this interpreter's cached environment during the block
+
+    A no-op when not running from a cached environment.
+    """
+    env_path = current_env()
+    if env_path is None:
+        yield
+        return
+    with _lock_file(env_path + IN_USE_LOCK, fcntl.LOCK_SH):
+        yield
+
+
+def uv_build(env_path: str, project_dir: str) -> None:
+    """Create the environment from the lockfile with uv"""
+    env = dict(os.environ, UV_PROJECT_ENVIRONMENT=env_path)
+    try:
+        subprocess.run(
+            ["uv", "sync", "--frozen", "--no-install-project", "--project", project_dir],
+            env=env, check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise BuildError(f"uv sync failed with exit code {e.returncode}") from e
+
+
+def bootstrap(lockfile: str = DEFAULT_LOCKFILE,
+              cache_dir: Optional[str] = None,
+              link: Optional[str] = None,
+              build: Callable[[str, str], None] = uv_build) -> BootstrapResult:
+    """Return a ready environment for the lockfile, building it on a cache miss"""
+    start = time.monotonic()
+    cache_dir = cache_dir or default_cache_dir()
+    project_dir = os.path.dirname(os.path.abspath(lockfile))
+    key = cache_key(lockfile, os.path.join(project_dir, DEFAULT_PYTHON_VERSION_FILE))
+    env_path = os.path.join(cache_dir, key)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with _env_lock(env_path):
+        hit = usable(env_path)
+        if not hit:
+            # A half-built leftover from a killed build, or one whose interpreter is gone
+            shutil.rmtree(env_path, ignore_errors=True)
+            build(env_path, project_dir)
+            with open(os.path.join(env_path, COMPLETE_MARKER), "w") as fh:
+                json.dump({"lockfile": os.path.abspath(lockfile), "built_at": time.time()}, fh)
+        # Touch on every use so pruning keeps the environments builds actually need
+        os.utime(env_path)
+
+    if link:
+        if os.path.islink(link):
+            os.unlink(link)
+        elif os.path.exists(link):
+            raise ValueError(f"{link} exists and is not a symlink; refusing to replace it")
+        os.symlink(env_path, link)
+
+    return BootstrapResult(key, env_path, hit, time.monotonic() - start)
+
+
+def prune(cache_dir: Optional[str] = None, keep: int = 5) -> List[str]:
+    """Remove all but the `keep` most recently used environments, and their lock files
+
+    Environments that are being built or used by a `demo run` are skipped.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return []
+    names = os.listdir(cache_dir)
+    envs = [os.path.join(cache_dir, name) for name in names
+            if os.path.isdir(os.path.join(cache_dir, name))]
+    envs.sort(key=os.path.getmtime, reverse=True)
+    # Lock files left behind without an environment (e.g. by a failed build)
+    orphans = sorted({os.path.join(cache_dir, name[:-len(suffix)])
+                      for name in names for suffix in (BUILD_LOCK, IN_USE_LOCK)
+                      if name.endswith(suffix)} - set(envs))
+    removed = []
+    for env_path in envs[keep:] + orphans:
+        with _env_lock(env_path, blocking=False) as idle, \
+                _lock_file(env_path + IN_USE_LOCK, fcntl.LOCK_EX | fcntl.LOCK_NB) as unused:
+            if not (idle and unused):
+                continue  # being built, or a run is using it
+            if os.path.isdir(env_path):
+                shutil.rmtree(env_path, ignore_errors=True)
+                removed.append(env_path)
+            for suffix in (BUILD_LOCK, IN_USE_LOCK):
+                os.unlink(env_path + suffix)
+    return removed
@@ -0,0 +1,179 @@
+"""Structural DOM fingerprints to skip re-verifying known-good page states
+
+A verification step usually waits for a region of the page and then checks
+it element by element. Each check is another wait and another round trip.
+Instead, the browser hashes the region's structure in a single script
+call: tags, identifying attributes, own text and visibility. Polling that
+script is also the wait for the region, so when the hash is one this
+platform has already verified, the whole check costs one round trip and
+the detailed checks are skipped.
+
+Otherwise the full checks run as before. When the region looked different
+from the last known-good state, a diff of the two outlines is written as
+an artifact. When the full checks pass, the region is fingerprinted once
+more and that hash is learned. Only a state the full checks passed on is
+trusted, never a loading state seen before them. A miss therefore costs
+up to three extra script calls: two polls to tell a changed state from a
+loading one, and one to learn. That happens once per new page state and
+platform.
+
+Skipping only pays off where the full checks are more expensive than one
+script call, so the conftest only enables it with --fingerprint-cache.
+"""
+import difflib
+import os
+import re
+import time
+from typing import Callable, Dict, List
+
+from demo.backends import Driver
+from demo.state import merge_json, read_json
+
+DEFAULT_CACHE = os.path.join("log", "fingerprints.json")
+DEFAULT_ARTIFACT_DIR = os.path.join("log", "fingerprint-diffs")
+
+FINGERPRINT_SCRIPT = """
+const [selector, known] = arguments;
+const root = document.querySelector(selector);
+if (!root) return null;
+const ATTRIBUTES = ['id', 'class', 'alt', 'aria-label', 'role', 'href', 'type'];
+const outline = [];
+let hash = 0x811c9dc5, nodes = 0;
+const feed = s => {
+    for (let i = 0; i < s.length; i++) {
+        hash = Math.imul(hash ^ s.charCodeAt(i), 0x01000193) >>> 0;
+    }
+};
+const walk = (node, depth) => {
+    nodes++;
+    let line = node.tagName.toLowerCase();
+    for (const name of ATTRIBUTES) {
+        const value = node.getAttribute(name);
+        if (value) line += ` ${name}="${value}"`;
+    }
+    const own = Array.from(node.childNodes).filter(n => n.nodeType === 3)
+        .map(n => n.textContent.trim()).filter(Boolean).join(' ').slice(0, 60);
+    if (own) line += ` "${own}"`;
+    if (!node.getClientRects().length) line += ' [hidden]';
+    feed(depth + ' ' + line + '\\n');
+    outline.push('  '.repeat(depth) + line);
+    for (const child of node.children) walk(child, depth + 1);
+};
+walk(root, 0);
+const hex = hash.toString(16);
+// The outline is only needed (for a diff or to learn) when the state is not already known
+return {hash: hex, nodes: nodes, outline: known.includes(hex) ? null : outline};
+"""
+
+
+class FingerprintCache:
+    """Known-good fingerprints, persisted as {platform: {check: {hashes, outline}}}"""
+
+    def __init__(self, path: str = DEFAULT_CACHE, keep: int = 5):
+        self.path = path
+        self.keep = keep
+        self.entries: Dict[str, Dict[str, Dict]] = read_json(path)
+        self._pending: Dict[str, Dict[str, Dict]] = {}
+
+    def get(self, platform: str, check: str) -> Dict:
+        return self.entries.get(platform, {}).get(check, {"hashes": [], "outline": []})
+
+    def learn(self, platform: str, check: str, fingerprint: str, outline: List[str]) -> None:
+        for entries in (self.entries, self._pending):
+            entry = entries.setdefault(platform, {}).setdefault(check, {"hashes": [], "outline": []})
+            self._add(entry, fingerprint, outline)
+
+    def _add(self, entry: Dict, fingerprint: str, outline: List[str]) -> None:
+        if fingerprint in entry["hashes"]:
+            entry["hashes"].remove(fingerprint)
+        entry["hashes"].append(fingerprint)
+        del entry["hashes"][:-self.keep]
+        entry["outline"] = outline
+
+    def save(self) -> None:
+        """Add newly learned fingerprints to the file"""
+        if not self._pending:
+            return
+
+        def merge(merged: Dict[str, Dict[str, Dict]]) -> None:
+            for platform, checks in self._pending.items():
+                for check, new in checks.items():
+                    entry = merged.setdefault(platform, {}).setdefault(check, {"hashes": [], "outline": []})
+                    for fingerprint in new["hashes"]:
+                        self._add(entry, fingerprint, new["outline"])
+
+        self.entries = merge_json(self.path, merge)
+        self._pending = {}
+
+
+class Verifier:
+    """Always runs the full verification"""
+
+    def verify(self, driver: Driver, check: str, region: str, timeout: float,
+               full: Callable[[], None]) -> bool:
+        """Verify `region` (a CSS selector); returns True if the full checks were skipped"""
+        full()
+        return False
+
+
+class FingerprintVerifier(Verifier):
+    """Skips the full verification when the region matches a known-good fingerprint"""
+
+    def __init__(self, cache: FingerprintCache, platform: str,
+                 artifact_dir: str = DEFAULT_ARTIFACT_DIR, poll_interval: float = 0.25):
+        self.cache = cache
+        self.platform = platform
+        self.artifact_dir = artifact_dir
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, driver: Driver, region: str, timeout: float, known: List[str]) -> Dict:
+        """Poll until the region matches a known state or holds still; this is the region wait
+
+        Raises TimeoutError if the region never appears. A state that is not
+        known is only given up on once two polls agree, so a page still
+        loading is not mistaken for a changed one.
+        """
+        deadline = time.monotonic() + timeout
+        previous = None
+        while True:
+            current = driver.run_script(FINGERPRINT_SCRIPT, region, known)
+            if current is not None and (current["hash"] in known or
+                                        previous is not None and current["hash"] == previous["hash"]):
+                return current
+            if time.monotonic() >= deadline:
+                if current is None:
+                    raise TimeoutError(f"Timed out after {timeout}s waiting for {region}")
+                return current
+            previous = current
+            time.sleep(self.poll_interval)
+
+    def verify(self, driver: Driver, check: str, region: str, timeout: float,
+               full: Callable[[], None]) -> bool:
+        known = self.cache.get(self.platform, check)
+        current = self.fingerprint(driver, region, timeout, known["hashes"])
+        if current["hash"] in known["hashes"]:
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        if known["hashes"]:
+            # Record what changed before the full checks run, so failures get a diff too
+            self._write_diff(check, known["outline"], current["outline"])
+        full()
+        # Learn the state the full checks passed on, not one they may have waited out
+        verified = driver.run_script(FINGERPRINT_SCRIPT, region, [])
+        if verified is not None:
+            self.cache.learn(self.platform, check, verified["hash"], verified["outline"])
+        return False
+
+    def _write_diff(self, check: str, expected: List[str], actual: List[str]) -> str:
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", f"{self.platform}-{check}-{int(time.time() * 1000)}")
+        path = os.path.join(self.artifact_dir, f"{name}.diff")
+        with open(path, "w") as fh:
+            fh.writelines(difflib.unified_diff(
+                [line + "\n" for line in expected], [line + "\n" for line in actual],
+                fromfile="known-good", tofile="current"))
+        return path
@@ -0,0 +1,104 @@
+"""The login -> filter -> favourite -> verify flow, written once for every backend"""
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from demo.backends import Driver, css, link, text, xpath
+from demo.fingerprint import Verifier
+
+
+@dataclass
+class FlowConfig:
+    """Target site, account and timeouts for the flow"""
+    URL: str = "https://bstackdemo.com/"
+    USERNAME: str = "demouser"
+    PASSWORD: str = "testingisfun99"
+    VENDOR: str = "Samsung"
+    PRODUCT_ID: str = "11"
+    PRODUCT_TITLE: str = "Galaxy S20+"
+
+    DEFAULT_TIMEOUT: float = 60
+    # Region (CSS) holding the product list, checked after login and on Favourites
+    SHELF: str = ".shelf-container"
+
+
+class FlowError(AssertionError):
+    """A flow step failed; `step` names the step"""
+
+    def __init__(self, step: str, message: str):
+        super().__init__(f"{step}: {message}")
+        self.step = step
+
+
+def login(driver: Driver, config: FlowConfig, verifier: Verifier) -> None:
+    timeout = config.DEFAULT_TIMEOUT
+    driver.open(config.URL, timeout)
+    driver.click(link("Sign In"), timeout)
+
+    # The username placeholder is rendered more than once on some layouts
+    select_username = xpath("//div[contains(text(),'Select Username')]")
+    matches = driver.count(select_username, timeout)
+    driver.click_nth(select_username, 2 if matches > 2 else 0, timeout)
+    driver.click(text(config.USERNAME), timeout)
+
+    driver.click(text("Select Password"), timeout)
+    driver.click(text(config.PASSWORD), timeout)
+    driver.click(xpath("//button[normalize-space()='Log In']"), timeout)
+
+    def products_listed():
+        if not driver.count(css(f"{config.SHELF} .shelf-item"), timeout):
+            raise FlowError("login", "no products listed after login")
+
+    verifier.verify(driver, "login", config.SHELF, timeout, products_listed)
+
+
+def filter_vendor(driver: Driver, config: FlowConfig, verifier: Verifier) -> None:
+    driver.click(text(config.VENDOR), config.DEFAULT_TIMEOUT)
+
+
+def favourite_product(driver: Driver, config: FlowConfig, verifier: Verifier) -> None:
+    driver.click(css(f"[id='{config.PRODUCT_ID}'] button[aria-label='delete']"), config.DEFAULT_TIMEOUT)
+
+
+def verify_favourites(driver: Driver, config: FlowConfig, verifier: Verifier) -> None:
+    timeout = config.DEFAULT_TIMEOUT
+    driver.click(link("Favourites"), timeout)
+
+    def product_displayed():
+        if not driver.is_visible(xpath(f"//img[@alt='{config.PRODUCT_TITLE}']"), timeout):
+            raise FlowError("verify", f"{config.PRODUCT_TITLE} image is not displayed")
+
+    verifier.verify(driver, "favourites", config.SHELF, timeout, product_displayed)
+
+
+STEPS: List[Tuple[str, Callable[[Driver, FlowConfig, Verifier], None]]] = [
+    ("login", login),
+    ("filter", filter_vendor),
+    ("favourite", favourite_product),
+    ("verify", verify_favourites),
+]
+
+
+def run_flow(driver: Driver, config: FlowConfig,
+             timeouts: Optional[Callable[[str], float]] = None,
+             verifier: Optional[Verifier] = None) -> Dict[str, float]:
+    """Run every step in order and return each step's duration in seconds
+
+    `timeouts` maps a step name to the timeout used for every wait in that
+    step (see TimeoutModel.for_platform); without it DEFAULT_TIMEOUT is used.
+    `verifier` decides whether page checks can be short-circuited (see
+    FingerprintVerifier); by default every check runs in full.
+    """
+    verifier = verifier or Verifier()
+    durations: Dict[str, float] = {}
+    for step, func in STEPS:
+        step_config = replace(config, DEFAULT_TIMEOUT=timeouts(step)) if timeouts else config
+        start = time.perf_counter()
+        try:
+            func(driver, step_config, verifier)
+        except FlowError:
+            raise
+        except TimeoutError as e:
+            raise FlowError(step, str(e)) from e
+        durations[step] = time.perf_counter() - start
+    return durations
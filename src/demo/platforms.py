@@ -0,0 +1,96 @@
+"""Platform matrix helpers built on top of browserstack.yml"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CONFIG = "browserstack.yml"
+
+
+@dataclass(frozen=True)
+class Platform:
+    """A single browser / device combination from the platform matrix"""
+    index: int
+    capabilities: Dict = field(hash=False, compare=False)
+
+    @property
+    def is_mobile(self) -> bool:
+        return "deviceName" in self.capabilities
+
+    @property
+    def name(self) -> str:
+        caps = self.capabilities
+        if self.is_mobile:
+            parts = [caps.get("deviceName"), caps.get("browserName")]
+        else:
+            parts = [caps.get("os"), caps.get("osVersion"),
+                     caps.get("browserName"), caps.get("browserVersion")]
+        return " ".join(str(part) for part in parts if part is not None)
+
+
+def config_path(path: Optional[str] = None) -> str:
+    """Resolve the BrowserStack config file the same way the SDK does"""
+    return path or os.environ.get("BROWSERSTACK_CONFIG_FILE") or DEFAULT_CONFIG
+
+
+def load_config(path: Optional[str] = None) -> Dict:
+    """Load the raw BrowserStack config"""
+    import yaml
+
+    with open(config_path(path)) as fh:
+        return yaml.safe_load(fh) or {}
+
+
+def load_platforms(path: Optional[str] = None) -> List[Platform]:
+    """Load the platform matrix declared in the BrowserStack config"""
+    return platforms_from_config(load_config(path))
+
+
+def platforms_from_config(config: Dict) -> List[Platform]:
+    return [Platform(i, dict(caps)) for i, caps in enumerate(config.get("platforms") or [])]
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse a 'k/n' shard spec (1-based) into (k, n)"""
+    try:
+        index, total = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec {spec!r}, expected 'k/n'") from None
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"Invalid shard spec {spec!r}, expected 1 <= k <= n")
+    return index, total
+
+
+def select_shard(platforms: List[Platform], index: int, total: int) -> List[Platform]:
+    """Round-robin split of the matrix so every shard gets a mix of desktop and mobile"""
+    return platforms[index - 1::total]
+
+
+def select_by_name(platforms: List[Platform], names: List[str]) -> List[Platform]:
+    """Keep platforms whose name contains any of the given substrings (case-insensitive)"""
+    needles = [name.lower() for name in names]
+    return [p for p in platforms if any(n in p.name.lower() for n in needles)]
+
+
+def write_config(config: Dict, platforms: List[Platform], path: str,
+                 local_identifier: Optional[str] = None) -> str:
+    """Write a copy of the config restricted to the given platforms
+
+    With `local_identifier`, sessions are pointed at an already running
+    BrowserStack Local tunnel instead of having the SDK start its own. This
+    is the SDK's own switch for an externally managed tunnel: with
+    `skipBinaryInitialisation` it starts no binary, and it still marks every
+    session `local` with the configured `localIdentifier`.
+    """
+    import yaml
+
+    derived = dict(config)
+    derived["platforms"] = [p.capabilities for p in platforms]
+    if local_identifier:
+        derived["browserstackLocal"] = True
+        derived["browserStackLocalOptions"] = dict(
+            config.get("browserStackLocalOptions") or {},
+            localIdentifier=local_identifier, skipBinaryInitialisation=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as fh:
+        yaml.safe_dump(derived, fh, sort_keys=False)
+    return path
@@ -0,0 +1,198 @@
+"""Per-worker resource accounting and a cap on concurrent heavy operations
+
+Every worker (one pytest process per platform under the SDK) records its RSS
+growth, open sockets and file descriptors, and the most WebElement
+references it held at once (the backends drop them as soon as each call
+returns, so the count at the end of the run is close to zero). Failure
+screenshots are the operation that spikes memory. They run under a
+machine-wide limit, implemented as flock'ed slot files, so a runner box
+hosting many sessions never materialises dozens of them at once.
+"""
+import fcntl
+import json
+import os
+import resource
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+RESOURCES_ENV_VAR = "DEMO_RESOURCES_FILE"
+DEFAULT_RESOURCES_FILE = os.path.join("log", "resources.jsonl")
+LEAN_ENV_VAR = "DEMO_LEAN"
+HEAVY_LIMIT_ENV_VAR = "DEMO_HEAVY_OPS_LIMIT"
+DEFAULT_HEAVY_LIMIT = 2
+
+# WebElement references handed out by the Selenium backend; entries vanish as soon
+# as the last reference is dropped, so the size is the number still alive.
+LIVE_ELEMENTS: "weakref.WeakSet" = weakref.WeakSet()
+# Most entries LIVE_ELEMENTS has held at once since the last reset_peak()
+_peak_live_elements = 0
+
+
+def lean_mode() -> bool:
+    """Release transient objects eagerly and throttle heavy operations"""
+    return os.environ.get(LEAN_ENV_VAR, "") not in ("", "0")
+
+
+def track_element(element):
+    global _peak_live_elements
+    LIVE_ELEMENTS.add(element)
+    _peak_live_elements = max(_peak_live_elements, len(LIVE_ELEMENTS))
+    return element
+
+
+def reset_peak() -> None:
+    global _peak_live_elements
+    _peak_live_elements = len(LIVE_ELEMENTS)
+
+
+@dataclass
+class ResourceSnapshot:
+    """Process resource usage at one point in time"""
+    rss_bytes: int
+    peak_rss_bytes: int
+    open_fds: int
+    sockets: int
+    live_elements: int
+    peak_live_elements: int
+
+    @classmethod
+    def take(cls) -> "ResourceSnapshot":
+        fds = _fd_targets()
+        return cls(
+            rss_bytes=_current_rss(),
+            # ru_maxrss is in KiB on Linux
+            peak_rss_bytes=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            open_fds=len(fds),
+            sockets=sum(target.startswith("socket:") for target in fds),
+            live_elements=len(LIVE_ELEMENTS),
+            peak_live_elements=_peak_live_elements,
+        )
+
+
+def _current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _fd_targets() -> List[str]:
+    targets = []
+    try:
+        names = os.listdir("/proc/self/fd")
+    except OSError:
+        return targets
+    for name in names:
+        try:
+            targets.append(os.readlink(os.path.join("/proc/self/fd", name)))
+        except OSError:
+            continue
+    return targets
+
+
+class WorkerAccounting:
+    """Resource usage of one worker between start() and finish()"""
+
+    def __init__(self, worker: str, path: Optional[str] = None):
+        self.worker = worker
+        self.path = path or os.environ.get(RESOURCES_ENV_VAR) or DEFAULT_RESOURCES_FILE
+        self.started: Optional[ResourceSnapshot] = None
+
+    def start(self) -> None:
+        reset_peak()
+        self.started = ResourceSnapshot.take()
+
+    def finish(self) -> Dict:
+        end = ResourceSnapshot.take()
+        start = self.started or end
+        record = {
+            "worker": self.worker,
+            "pid": os.getpid(),
+            "lean": lean_mode(),
+            "rss_delta_bytes": end.rss_bytes - start.rss_bytes,
+            "sockets_delta": end.sockets - start.sockets,
+            "heavy_operations": HEAVY_OPERATIONS.count,
+            "heavy_wait_seconds": round(HEAVY_OPERATIONS.wait_seconds, 3),
+            "end": asdict(end),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+        return record
+
+
+def summarise(path: str = DEFAULT_RESOURCES_FILE) -> List[str]:
+    """One line per worker recorded in a resources file"""
+    lines = []
+    try:
+        with open(path) as fh:
+            records = [json.loads(line) for line in fh if line.strip()]
+    except (OSError, ValueError):
+        return lines
+    for record in records:
+        end = record["end"]
+        lines.append(
+            f"{record['worker']}: rss {record['rss_delta_bytes'] / 2**20:+.1f} MiB "
+            f"(peak {end['peak_rss_bytes'] / 2**20:.0f} MiB), sockets {end['sockets']} "
+            f"({record['sockets_delta']:+d}), fds {end['open_fds']}, "
+            f"live elements {end['live_elements']} (peak {end['peak_live_elements']}), heavy ops {record['heavy_operations']} "
+            f"(waited {record['heavy_wait_seconds']:.1f}s)")
+    return lines
+
+
+class HeavyOperationLimiter:
+    """At most `limit` heavy operations at once across every process on the machine"""
+
+    def __init__(self, limit: Optional[int] = None, slot_dir: Optional[str] = None,
+                 poll_interval: float = 0.05):
+        self.limit = limit
+        self.slot_dir = slot_dir or os.path.join(
+            os.environ.get("TMPDIR", "/tmp"), f"demo-heavy-ops-{os.getuid()}")
+        self.poll_interval = poll_interval
+        self.count = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _limit(self) -> int:
+        return self.limit or int(os.environ.get(HEAVY_LIMIT_ENV_VAR, DEFAULT_HEAVY_LIMIT))
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of the block (no-op outside lean mode)"""
+        if not lean_mode():
+            self._account(0.0)
+            yield
+            return
+        os.makedirs(self.slot_dir, exist_ok=True)
+        start = time.monotonic()
+        held = None
+        while held is None:
+            for i in range(self._limit()):
+                fh = open(os.path.join(self.slot_dir, f"slot-{i}"), "w")
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    fh.close()
+                    continue
+                held = fh
+                break
+            else:
+                time.sleep(self.poll_interval)
+        self._account(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            held.close()  # closing the descriptor releases the flock
+
+    def _account(self, waited: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.wait_seconds += waited
+
+
+HEAVY_OPERATIONS = HeavyOperationLimiter()
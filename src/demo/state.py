@@ -0,0 +1,52 @@
+"""On-disk state shared between runs, builds and parallel workers"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+def user_cache_dir(name: str, override_env: str) -> str:
+    """`$override_env` if set, else `name` under $XDG_CACHE_HOME (or ~/.cache)"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.environ.get(override_env) or os.path.join(base, name)
+
+
+@contextmanager
+def locked(path: str):
+    """Hold an exclusive lock on `<path>.lock` for the duration of the block"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def read_json(path: str) -> Dict:
+    """Contents of a JSON state file; empty if it is missing or unreadable"""
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(path: str, data: Dict) -> None:
+    """Replace a JSON state file atomically, so readers never see a partial write"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def merge_json(path: str, merge: Callable[[Dict], None]) -> Dict:
+    """Apply `merge` to the file's latest contents under its lock and write them back
+
+    Every writer merges into what is on disk at that moment, so writers
+    working from stale copies never drop each other's updates. Returns the
+    merged contents.
+    """
+    with locked(path):
+        data = read_json(path)
+        merge(data)
+        write_json(path, data)
+    return data
@@ -0,0 +1,128 @@
+"""Per-(platform, step) timeouts learned from recorded step durations
+
+A flat worst-case wait makes a broken locator cost a full minute even on a
+desktop browser that normally finishes the step in two seconds. Instead
+every successful step duration is recorded per platform. The timeout is a
+high percentile of that history times a safety margin, clamped to a floor
+and a ceiling. Platforms without enough history use the old flat timeout.
+
+A step that hits its timeout is recorded too, as a censored sample: it
+only shows that the step took longer than the timeout. Until the step
+succeeds again, each run waits longer than the attempt that failed: the
+timeout it hit times the margin, at least the flat fallback and at most
+the ceiling. That way a site that got slower than the learned value is
+re-measured instead of failing every run at the same timeout, and a slow
+platform whose learned value is above the fallback is not cut short. The most recent durations also put
+a lower bound on the timeout, so the new level is picked up straight away
+instead of only once it reaches the percentile.
+"""
+import os
+import statistics
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from demo.state import merge_json, read_json
+
+DEFAULT_HISTORY = os.path.join("log", "step-durations.json")
+
+
+@dataclass
+class TimeoutPolicy:
+    """How recorded durations are turned into timeouts (seconds)"""
+    PERCENTILE: int = 95
+    MARGIN: float = 1.5
+    MIN_SAMPLES: int = 5
+    FLOOR: float = 5
+    CEILING: float = 90
+    FALLBACK: float = 60
+    # The timeout never drops below the slowest of the last few durations (times MARGIN)
+    RECENT: int = 3
+    # Only the most recent samples are kept so the model follows platform changes
+    WINDOW: int = 50
+
+
+class DurationHistory:
+    """Recorded step durations, persisted as {platform: {step: [seconds, ...]}}
+
+    A timed-out step is stored as the negated timeout it hit (a censored sample).
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY, window: int = TimeoutPolicy.WINDOW):
+        self.path = path
+        self.window = window
+        self.samples: Dict[str, Dict[str, List[float]]] = read_json(path)
+        self._pending: Dict[str, Dict[str, List[float]]] = {}
+
+    def get(self, platform: str, step: str) -> List[float]:
+        """Durations of the successful runs of a step, oldest first"""
+        return [s for s in self.samples.get(platform, {}).get(step, []) if s >= 0]
+
+    def last_timeout(self, platform: str, step: str) -> Optional[float]:
+        """The timeout the step's most recent run hit, if it timed out"""
+        samples = self.samples.get(platform, {}).get(step, [])
+        return -samples[-1] if samples and samples[-1] < 0 else None
+
+    def timed_out(self, platform: str, step: str) -> bool:
+        """The step's most recent run hit its timeout"""
+        return self.last_timeout(platform, step) is not None
+
+    def record(self, platform: str, step: str, seconds: float) -> None:
+        """Record a successful step"""
+        self._append(platform, step, seconds)
+
+    def record_timeout(self, platform: str, step: str, timeout: float) -> None:
+        """Record that a step did not finish within `timeout` seconds"""
+        self._append(platform, step, -timeout)
+
+    def _append(self, platform: str, step: str, seconds: float) -> None:
+        for samples in (self.samples, self._pending):
+            samples.setdefault(platform, {}).setdefault(step, []).append(round(seconds, 3))
+            del samples[platform][step][:-self.window]
+
+    def record_all(self, platform: str, durations: Dict[str, float]) -> None:
+        for step, seconds in durations.items():
+            self.record(platform, step, seconds)
+
+    def save(self) -> None:
+        """Append this process's new samples to the file"""
+        if not self._pending:
+            return
+
+        def merge(merged: Dict[str, Dict[str, List[float]]]) -> None:
+            for platform, steps in self._pending.items():
+                for step, new in steps.items():
+                    samples = merged.setdefault(platform, {}).setdefault(step, [])
+                    samples.extend(new)
+                    del samples[:-self.window]
+
+        self.samples = merge_json(self.path, merge)
+        self._pending = {}
+
+
+class TimeoutModel:
+    """Computes timeouts from a DurationHistory according to a TimeoutPolicy"""
+
+    def __init__(self, history: DurationHistory, policy: Optional[TimeoutPolicy] = None):
+        self.history = history
+        self.policy = policy or TimeoutPolicy()
+
+    def timeout(self, platform: str, step: str) -> float:
+        policy = self.policy
+        samples = self.history.get(platform, step)
+        hit = self.history.last_timeout(platform, step)
+        if hit is not None:
+            # Always give the retry more time than the attempt that failed
+            return round(min(max(policy.FALLBACK, hit * policy.MARGIN), policy.CEILING), 1)
+        if len(samples) < max(policy.MIN_SAMPLES, 2):
+            return policy.FALLBACK
+        percentile = statistics.quantiles(samples, n=100, method="inclusive")[policy.PERCENTILE - 1]
+        expected = max(percentile, *samples[-policy.RECENT:])
+        return round(min(max(expected * policy.MARGIN, policy.FLOOR), policy.CEILING), 1)
+
+    def record_timeout(self, platform: str, step: str) -> None:
+        """Record that a step hit the timeout this model gave it"""
+        self.history.record_timeout(platform, step, self.timeout(platform, step))
+
+    def for_platform(self, platform: str) -> Callable[[str], float]:
+        """Step -> timeout function for one platform, as taken by run_flow"""
+        return lambda step: self.timeout(platform, step)
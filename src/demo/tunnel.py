@@ -0,0 +1,301 @@
+"""BrowserStack Local tunnel shared across sessions, shards and runs
+
+Starting the tunnel costs several seconds per build, and every build used
+to start and tear down its own. TunnelManager starts one tunnel daemon
+with a generated localIdentifier. It records the daemon in a state file
+and hands the same tunnel to every concurrent run on the machine. When the
+last holder releases it, the tunnel stays warm. A detached reaper, started
+with the tunnel, stops it only after `idle_timeout` seconds without a
+holder. Holders that die without releasing (a crashed or killed run) stop
+counting once their PID is gone.
+
+A tunnel is reused only while its daemon runs and BrowserStack's Local
+REST API still lists its localIdentifier as running. A daemon that lost
+its connection is replaced. If the API cannot be reached, only the daemon
+process is checked, so a network blip on this side does not restart a
+working tunnel.
+
+Both the daemon and the reaper must outlive the build that started them.
+Jenkins' ProcessTreeKiller kills every process that inherited the build's
+BUILD_ID or JENKINS_NODE_COOKIE when the build ends. Without stripping
+those from their environment, every build would find the previous tunnel
+dead and start a new one.
+
+The binary is driven through its daemon interface, the same one the
+browserstack-local package uses: `-d start|stop ... -k KEY
+-localIdentifier ID`, printing a JSON status line. Any executable speaking
+that interface works, which is how the tests use a stub.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from demo.state import locked, read_json, user_cache_dir, write_json
+
+DEFAULT_IDLE_TIMEOUT = 600
+# How often a waiting reaper checks whether the holders are still alive
+REAP_POLL_INTERVAL = 30
+# How long the binary may take to connect (or disconnect) before it is given up on
+DAEMON_TIMEOUT = 120
+# BrowserStack's list of the account's running Local binaries
+LOCAL_LIST_URL = "https://www.browserstack.com/local/v1/list?auth_token={key}&last=50&state=running"
+STATUS_TIMEOUT = 10
+STATE_FILE = "tunnel.json"
+# Variables CI servers use to find and kill a build's leftover processes
+BUILD_SCOPED_ENV = ("BUILD_ID", "JENKINS_NODE_COOKIE")
+
+
+class TunnelError(RuntimeError):
+    """The tunnel binary failed to start or reported an error"""
+
+
+@dataclass
+class TunnelLease:
+    """A hold on the shared tunnel"""
+    local_identifier: str
+    pid: int
+    reused: bool
+    startup_seconds: float
+
+    def summary(self) -> str:
+        if self.reused:
+            return (f"tunnel {self.local_identifier} reused "
+                    f"(saved ~{self.startup_seconds:.1f}s of startup)")
+        return f"tunnel {self.local_identifier} started in {self.startup_seconds:.1f}s"
+
+
+def default_state_dir() -> str:
+    return user_cache_dir("demo-tunnel", "DEMO_TUNNEL_DIR")
+
+
+def detached_env() -> Dict[str, str]:
+    """Environment for processes that must survive the end of the CI build"""
+    return {name: value for name, value in os.environ.items() if name not in BUILD_SCOPED_ENV}
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # A crashed daemon can linger as a zombie until its parent reaps it
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            return fh.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+class TunnelManager:
+    """Starts, shares and retires the BrowserStack Local daemon"""
+
+    def __init__(self, binary: Optional[str] = None, key: Optional[str] = None,
+                 state_dir: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 spawn_reaper: bool = True, status_url: Optional[str] = LOCAL_LIST_URL):
+        self.binary = binary or os.environ.get("BROWSERSTACK_LOCAL_BINARY")
+        self.key = key or os.environ.get("BROWSERSTACK_ACCESS_KEY", "")
+        self.state_dir = state_dir or default_state_dir()
+        self.idle_timeout = idle_timeout
+        self.spawn_reaper = spawn_reaper
+        # None only checks the daemon process
+        self.status_url = status_url
+        self.state_path = os.path.join(self.state_dir, STATE_FILE)
+        self.log_path = os.path.join(self.state_dir, "local.log")
+
+    # State handling
+
+    def _locked(self):
+        return locked(self.state_path)
+
+    def _read_state(self) -> Optional[Dict]:
+        state = read_json(self.state_path)
+        if not state:
+            return None
+        # Holders that died without releasing (e.g. a killed build) no longer count
+        state["holders"] = [pid for pid in state.get("holders", []) if pid_alive(pid)]
+        return state
+
+    def _write_state(self, state: Optional[Dict]) -> None:
+        if state is None:
+            if os.path.exists(self.state_path):
+                os.unlink(self.state_path)
+            return
+        write_json(self.state_path, state)
+
+    def status(self) -> Optional[Dict]:
+        with self._locked():
+            state = self._read_state()
+        if state is not None:
+            state["healthy"] = self.healthy(state)
+            state["idle_seconds"] = 0 if state["holders"] else time.time() - state["last_used"]
+        return state
+
+    def healthy(self, state: Dict) -> bool:
+        """The daemon runs and its connection has not been reported as down"""
+        return pid_alive(state["pid"]) and self.connected(state) is not False
+
+    def connected(self, state: Dict) -> Optional[bool]:
+        """Whether BrowserStack lists the tunnel as running; None if it cannot tell"""
+        if not self.status_url or not self.key:
+            return None
+        url = self.status_url.format(key=urllib.parse.quote(self.key))
+        try:
+            with urllib.request.urlopen(url, timeout=STATUS_TIMEOUT) as response:
+                data = json.load(response)
+        except (OSError, ValueError):
+            return None
+        instances = data.get("instances") if isinstance(data, dict) else None
+        if not isinstance(instances, list):
+            return None
+        return any(isinstance(instance, dict) and
+                   instance.get("localIdentifier") == state["local_identifier"]
+                   for instance in instances)
+
+    # Binary interface
+
+    def _command(self, action: str, local_identifier: str, binary: Optional[str] = None) -> List[str]:
+        binary = binary or self.binary or self._download_binary()
+        return [binary, "-d", action, "-logFile", self.log_path, "-k", self.key,
+                "-localIdentifier", local_identifier]
+
+    def _download_binary(self) -> str:
+        from browserstack.local_binary import LocalBinary
+
+        self.binary = LocalBinary(self.key).get_binary()
+        return self.binary
+
+    def _start_daemon(self) -> Dict:
+        local_identifier = f"demo-{uuid.uuid4().hex[:12]}"
+        start = time.monotonic()
+        try:
+            # Bounded: this runs under the machine-wide state lock every run waits for
+            result = subprocess.run(self._command("start", local_identifier), capture_output=True,
+                                    text=True, env=detached_env(), timeout=DAEMON_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            raise TunnelError(f"Tunnel binary did not connect within {DAEMON_TIMEOUT}s") from None
+        startup_seconds = time.monotonic() - start
+        try:
+            data = json.loads(result.stdout or result.stderr)
+        except ValueError:
+            raise TunnelError(f"Unexpected output from tunnel binary: {result.stdout or result.stderr!r}")
+        if data.get("state") != "connected":
+            message = data.get("message")
+            if isinstance(message, dict):
+                message = message.get("message")
+            raise TunnelError(f"Tunnel failed to connect: {message}")
+        now = time.time()
+        return {"pid": int(data["pid"]), "local_identifier": local_identifier, "binary": self.binary,
+                "started_at": now, "startup_seconds": startup_seconds,
+                "last_used": now, "holders": []}
+
+    def _stop_daemon(self, state: Dict) -> None:
+        # Use the binary that started the daemon; the reaper process is not told which one it was
+        try:
+            subprocess.run(self._command("stop", state["local_identifier"], state.get("binary")),
+                           capture_output=True, timeout=DAEMON_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            pass  # terminated below
+        if pid_alive(state["pid"]):
+            try:
+                os.kill(state["pid"], signal.SIGTERM)
+            except ProcessLookupError:
+                return
+        # Wait for the daemon to go away so a replacement can bind its ports
+        deadline = time.monotonic() + 5
+        while pid_alive(state["pid"]) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    # Public API
+
+    def acquire(self, holder: Optional[int] = None) -> TunnelLease:
+        """Hold the shared tunnel, starting it if it is not running (or unhealthy)"""
+        holder = holder or os.getpid()
+        with self._locked():
+            state = self._read_state()
+            reused = state is not None and self.healthy(state)
+            if state is not None and not reused:
+                self._stop_daemon(state)
+            if not reused:
+                state = self._start_daemon()
+            if holder not in state["holders"]:
+                state["holders"].append(holder)
+            state["last_used"] = time.time()
+            # Reap even if no holder ever releases (e.g. the run crashes)
+            self._ensure_reaper(state)
+            self._write_state(state)
+        return TunnelLease(state["local_identifier"], state["pid"], reused, state["startup_seconds"])
+
+    def release(self, holder: Optional[int] = None) -> None:
+        """Drop a hold; the tunnel stays warm for `idle_timeout` seconds"""
+        holder = holder or os.getpid()
+        with self._locked():
+            state = self._read_state()
+            if state is None:
+                return
+            state["holders"] = [pid for pid in state["holders"] if pid != holder]
+            state["last_used"] = time.time()
+            if not state["holders"]:
+                self._ensure_reaper(state)
+            self._write_state(state)
+
+    def _ensure_reaper(self, state: Dict) -> None:
+        """Start a reaper for the tunnel unless one is already waiting (call under the lock)"""
+        reaper = state.get("reaper")
+        if self.spawn_reaper and not (reaper and pid_alive(reaper)):
+            state["reaper"] = self._spawn_reaper()
+
+    def _spawn_reaper(self) -> int:
+        return subprocess.Popen(
+            [sys.executable, "-m", "demo", "tunnel", "--state-dir", self.state_dir,
+             "--idle-timeout", str(self.idle_timeout), "reap", "--wait"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True, env=detached_env(),
+        ).pid
+
+    def reap(self, wait: bool = False) -> bool:
+        """Stop the tunnel if nobody holds it and it has been idle too long
+
+        With `wait`, keep waiting while the tunnel is held and until the idle
+        timeout expires instead of giving up straight away. Returns True if the
+        tunnel was stopped.
+        """
+        last_held = 0.0
+        while True:
+            with self._locked():
+                state = self._read_state()
+                if state is None:
+                    return False
+                if state["holders"]:
+                    last_held = time.time()
+                    delay = min(self.idle_timeout, REAP_POLL_INTERVAL)
+                else:
+                    # A holder that died without releasing counts as released when last seen alive
+                    idle = time.time() - max(state["last_used"], last_held)
+                    if idle >= self.idle_timeout:
+                        self._stop_daemon(state)
+                        self._write_state(None)
+                        return True
+                    delay = self.idle_timeout - idle
+            if not wait:
+                return False
+            time.sleep(max(delay, 0.1))
+
+    def stop(self) -> bool:
+        """Stop the tunnel regardless of holders"""
+        with self._locked():
+            state = self._read_state()
+            if state is None:
+                return False
+            self._stop_daemon(state)
+            self._write_state(None)
+            return True
@@ -0,0 +1,143 @@
+import gc
+import os
+import re
+
+import pytest
+
+from demo.backends import BACKENDS, DEFAULT_BACKEND
+from demo.breaker import TRIPPED_EXIT_CODE, CircuitBreaker
+from demo.resources import RESOURCES_ENV_VAR, WorkerAccounting, lean_mode
+
+BREAKER = pytest.StashKey()
+ACCOUNTING = pytest.StashKey()
+SCREENSHOT_DIR = os.path.join("log", "screenshots")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--backend", choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+                     help="browser automation backend used by the `driver` fixture")
+    parser.addoption("--step-history", default=None,
+                     help="step duration history used for adaptive timeouts "
+                          "(default: log/step-durations.json)")
+    parser.addoption("--fingerprint-cache", default=None,
+                     help="skip page checks whose region matches a known-good DOM fingerprint "
+                          "stored in this file (default: always run the full checks)")
+
+
+def pytest_configure(config):
+    config.stash[BREAKER] = CircuitBreaker.from_env()
+    accounting = None
+    if os.environ.get(RESOURCES_ENV_VAR):
+        accounting = WorkerAccounting(f"{_platform_name(config)}#{os.getpid()}")
+        accounting.start()
+    config.stash[ACCOUNTING] = accounting
+
+
+def pytest_unconfigure(config):
+    breaker = config.stash.get(BREAKER, None)
+    if breaker is not None:
+        breaker.close()
+    accounting = config.stash.get(ACCOUNTING, None)
+    if accounting is not None:
+        accounting.finish()
+
+
+def pytest_runtest_setup(item):
+    # Don't start another (paid) session once the build is known to be doomed
+    breaker = item.config.stash[BREAKER]
+    trip = breaker.trip() if breaker is not None else None
+    if trip is not None:
+        pytest.exit(f"Circuit breaker open: {trip.error}: {trip.message}", returncode=TRIPPED_EXIT_CODE)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = yield
+    breaker = item.config.stash[BREAKER]
+    if breaker is not None and report.failed and call.excinfo is not None:
+        breaker.record_failure(f"{_platform_name(item.config)}#{os.getpid()}", call.excinfo.value)
+    driver = getattr(item, "funcargs", {}).get("driver")
+    if report.when == "call" and report.failed and driver is not None:
+        _save_failure_screenshot(driver, item.nodeid)
+    return report
+
+
+def pytest_runtest_teardown(item):
+    if lean_mode():
+        # Drop element lists and page payloads from the finished test straight away
+        gc.collect()
+
+
+def _save_failure_screenshot(driver, nodeid: str) -> None:
+    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+    name = re.sub(r"[^\w.-]+", "_", f"{nodeid}-{os.getpid()}")
+    try:
+        driver.screenshot(os.path.join(SCREENSHOT_DIR, f"{name}.png"))
+    except Exception:
+        pass  # the session may already be gone (e.g. cancelled by the breaker)
+
+
+def _platform_name(config) -> str:
+    index = os.environ.get("BROWSERSTACK_PLATFORM_INDEX")
+    if index is not None:
+        from demo.platforms import load_platforms
+
+        platforms = load_platforms()
+        if int(index) < len(platforms):
+            return platforms[int(index)].name
+    return f"local {config.getoption('backend')}"
+
+
+@pytest.fixture
+def driver(request):
+    """Backend-neutral driver on top of pytest-selenium's or pytest-playwright's session"""
+    backend = request.config.getoption("backend")
+    if backend == "playwright":
+        from demo.backends.playwright_backend import PlaywrightDriver
+
+        driver = PlaywrightDriver(request.getfixturevalue("page"))
+    else:
+        from demo.backends.selenium_backend import SeleniumDriver
+
+        driver = SeleniumDriver(request.getfixturevalue("selenium"))
+
+    breaker = request.config.stash[BREAKER]
+    if breaker is None:
+        yield driver
+        return
+    breaker.register(driver)
+    try:
+        yield driver
+    finally:
+        breaker.unregister(driver)
+
+
+@pytest.fixture(scope="session")
+def platform_name(request):
+    """Name of the platform this worker runs on, as listed by `demo platforms`"""
+    return _platform_name(request.config)
+
+
+@pytest.fixture(scope="session")
+def timeout_model(request):
+    """Adaptive step timeouts; durations recorded during the session are saved at the end"""
+    from demo.timeouts import DEFAULT_HISTORY, DurationHistory, TimeoutModel
+
+    history = DurationHistory(request.config.getoption("step_history") or DEFAULT_HISTORY)
+    yield TimeoutModel(history)
+    history.save()
+
+
+@pytest.fixture(scope="session")
+def verifier(request, platform_name):
+    """Page checks, short-circuited by known-good DOM fingerprints with --fingerprint-cache"""
+    from demo.fingerprint import FingerprintCache, FingerprintVerifier, Verifier
+
+    path = request.config.getoption("fingerprint_cache")
+    if not path:
+        yield Verifier()
+        return
+    cache = FingerprintCache(path)
+    yield FingerprintVerifier(cache, platform_name)
+    cache.save()
+
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import threading
+import time
+
+import greenlet
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+from demo.backends import css
+from demo.backends.playwright_backend import PlaywrightDriver
+from demo.breaker import CircuitBreaker, root_exception, signature
+from demo.flow import FlowError
+
+
+class AuthError(Exception):
+    pass
+
+
+@pytest.fixture
+def breaker(tmp_path):
+    breaker = CircuitBreaker(str(tmp_path / "breaker.jsonl"), threshold=2, window=60,
+                             poll_interval=0.01)
+    breaker.reset()
+    yield breaker
+    breaker.close()
+
+
+def test_same_error_on_distinct_workers_trips(breaker):
+    breaker.record_failure("chrome#1", AuthError("401 Unauthorized"))
+    assert breaker.trip() is None
+    breaker.record_failure("edge#2", AuthError("401 Unauthorized"))
+
+    trip = breaker.trip()
+    assert trip.error == "AuthError"
+    assert trip.workers == ["chrome#1", "edge#2"]
+    assert "Root cause: AuthError: 401 Unauthorized" in trip.report()
+
+
+def test_repeat_failures_on_one_worker_do_not_trip(breaker):
+    breaker.record_failure("chrome#1", AuthError("401"))
+    breaker.record_failure("chrome#1", AuthError("401"))
+    assert breaker.trip() is None
+
+
+def test_different_errors_do_not_trip(breaker):
+    breaker.record_failure("chrome#1", AuthError("401"))
+    breaker.record_failure("edge#2", TimeoutError("slow"))
+    assert breaker.trip() is None
+
+
+def flow_timeout(step, locator, seconds):
+    try:
+        raise TimeoutError(f"Timed out after {seconds}s waiting for {locator}")
+    except TimeoutError as e:
+        try:
+            raise FlowError(step, str(e)) from e
+        except FlowError as flow_error:
+            return flow_error
+
+
+def test_unrelated_timeouts_do_not_trip(breaker):
+    breaker.record_failure("chrome#1", flow_timeout("login", "('xpath', '//a')", 6.0))
+    breaker.record_failure("edge#2", flow_timeout("verify", "('css', '.shelf')", 9.5))
+    assert breaker.trip() is None
+
+
+def test_same_timeout_in_the_same_step_trips(breaker):
+    breaker.record_failure("chrome#1", flow_timeout("login", "('xpath', '//a')", 6.0))
+    breaker.record_failure("edge#2", flow_timeout("login", "('xpath', '//a')", 13.5))
+
+    trip = breaker.trip()
+    assert (trip.error, trip.step) == ("TimeoutError", "login")
+    assert "in step 'login'" in trip.report()
+
+
+def test_assertion_failures_do_not_trip(breaker):
+    breaker.record_failure("chrome#1", FlowError("verify", "Galaxy S20+ image is not displayed"))
+    breaker.record_failure("edge#2", FlowError("verify", "Galaxy S20+ image is not displayed"))
+    assert breaker.trip() is None
+
+
+def test_failures_outside_window_do_not_trip(breaker):
+    with open(breaker.path, "a") as fh:
+        fh.write(json.dumps({"time": 0, "worker": "chrome#1", "error": "AuthError", "message": "401",
+                             "signature": signature("AuthError", None, "401")}) + "\n")
+    breaker.record_failure("edge#2", AuthError("401"))
+    assert breaker.trip() is None
+
+
+def test_root_exception_follows_cause():
+    try:
+        try:
+            raise AuthError("401")
+        except AuthError as e:
+            raise AssertionError("login failed") from e
+    except AssertionError as e:
+        assert isinstance(root_exception(e), AuthError)
+
+
+class SlowDriver:
+    def __init__(self, barrier):
+        self.barrier = barrier
+        self.quit_called = False
+
+    def quit(self):
+        # Only returns once every session is being quit at the same time
+        self.barrier.wait(timeout=5)
+        self.quit_called = True
+
+
+def test_trip_quits_live_sessions_in_parallel(breaker):
+    barrier = threading.Barrier(2)
+    drivers = [SlowDriver(barrier), SlowDriver(barrier)]
+    for driver in drivers:
+        breaker.register(driver)
+
+    breaker.record_failure("chrome#1", AuthError("401"))
+    breaker.record_failure("edge#2", AuthError("401"))
+    breaker._watcher.join(timeout=5)
+
+    assert all(driver.quit_called for driver in drivers)
+
+
+class ThreadBoundPage:
+    """Stands in for a Playwright page: usable only from its thread, driven by its event loop"""
+
+    def __init__(self):
+        self.owner = threading.get_ident()
+        self._loop = asyncio.new_event_loop()
+        self._closed = self._loop.create_future()
+        page = self
+
+        class Impl:
+            async def close(self):
+                page._closed.set_result(None)
+
+        self._impl_obj = Impl()
+
+    def close(self):
+        if threading.get_ident() != self.owner:
+            raise greenlet.error("cannot switch to a different thread")
+        self._closed.set_result(None)
+
+    def locator(self, selector):
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    def wait_for(self, state, timeout):
+        # A sync call: the owner runs the loop until the page answers or closes
+        self._loop.run_until_complete(self._closed)
+        raise PlaywrightError("Target page, context or browser has been closed")
+
+
+def test_trip_closes_playwright_page_on_its_own_thread(breaker):
+    registered = threading.Event()
+    outcome = []
+
+    def worker():
+        driver = PlaywrightDriver(ThreadBoundPage())
+        breaker.register(driver)
+        registered.set()
+        try:
+            driver.count(css(".shelf-item"), timeout=60)
+        except PlaywrightError as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert registered.wait(timeout=5)
+    breaker.record_failure("chrome#1", AuthError("401"))
+    breaker.record_failure("edge#2", AuthError("401"))
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert "closed" in str(outcome[0])
+
+
+class OpaquePage:
+    """A page without the Playwright internals cancel() uses for its fast path"""
+
+    def locator(self, selector):
+        raise AssertionError("the page was used after the session was cancelled")
+
+
+def test_cancel_without_playwright_internals_stops_the_next_call():
+    driver = PlaywrightDriver(OpaquePage())
+    canceller = threading.Thread(target=driver.cancel)
+    canceller.start()
+    canceller.join(timeout=5)
+
+    with pytest.raises(PlaywrightError, match="cancelled"):
+        driver.click(css(".shelf-item"), timeout=60)
+
+
+def test_trip_interrupts_a_real_playwright_wait(breaker):
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        try:
+            browser = playwright.chromium.launch()
+        except PlaywrightError as e:
+            pytest.skip(f"no Playwright browser installed: {e.message.splitlines()[0]}")
+        try:
+            driver = PlaywrightDriver(browser.new_page())
+            driver.page.set_content("<p>no products</p>")
+            breaker.register(driver)
+            threading.Timer(0.5, breaker.cancel).start()
+
+            start = time.monotonic()
+            with pytest.raises(PlaywrightError):
+                driver.count(css(".shelf-item"), timeout=30)
+            assert time.monotonic() - start < 10
+        finally:
+            browser.close()
@@ -0,0 +1,202 @@
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from demo import platforms as matrix
+from demo.cli import main
+
+CONFIG = """\
+userName: BROWSERSTACK_USERNAME
+platforms:
+  - os: OS X
+    osVersion: Ventura
+    browserName: Chrome
+    browserVersion: latest
+  - os: Windows
+    osVersion: 10
+    browserName: Edge
+    browserVersion: latest
+  - deviceName: Samsung Galaxy S22 Ultra
+    browserName: chrome
+    osVersion: 12.0
+"""
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "browserstack.yml"
+    path.write_text(CONFIG)
+    return str(path)
+
+
+def test_platforms_lists_matrix(config, capsys):
+    assert main(["--config", config, "platforms"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        "0\tdesktop\tOS X Ventura Chrome latest",
+        "1\tdesktop\tWindows 10 Edge latest",
+        "2\tmobile\tSamsung Galaxy S22 Ultra chrome",
+    ]
+
+
+def test_shard_is_round_robin_and_writes_config(config, tmp_path, capsys):
+    out = tmp_path / "shard.yml"
+    assert main(["--config", config, "shard", "1/2", "-o", str(out)]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "OS X Ventura Chrome latest", "Samsung Galaxy S22 Ultra chrome"]
+    derived = matrix.load_platforms(str(out))
+    assert [p.name for p in derived] == ["OS X Ventura Chrome latest", "Samsung Galaxy S22 Ultra chrome"]
+    assert matrix.load_config(str(out))["userName"] == "BROWSERSTACK_USERNAME"
+
+
+@pytest.mark.parametrize("spec", ["0/2", "3/2", "1/0", "x"])
+def test_invalid_shard_spec(spec):
+    with pytest.raises(ValueError):
+        matrix.parse_shard(spec)
+
+
+def test_report_summarises_junit(tmp_path, capsys):
+    suite = ET.Element("testsuite")
+    ET.SubElement(suite, "testcase", classname="tests.test_a", name="test_ok", time="1.5")
+    failed = ET.SubElement(suite, "testcase", classname="tests.test_a", name="test_bad")
+    ET.SubElement(failed, "failure", message="boom")
+    path = tmp_path / "results.xml"
+    ET.ElementTree(suite).write(path)
+
+    assert main(["report", str(path)]) == 1
+    out = capsys.readouterr().out
+    assert "PASSED   tests.test_a::test_ok (1.5s)" in out
+    assert "1 passed, 1 failed, 0 skipped" in out
+
+
+def test_listing_does_not_import_browser_stacks(config):
+    probe = (
+        "import json, sys, io, contextlib\n"
+        "from demo.cli import main\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    main(['--config', {config!r}, 'platforms'])\n"
+        "print(json.dumps([m for m in ('selenium', 'playwright', 'browserstack_sdk', 'pytest')"
+        " if m in sys.modules]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True)
+    assert json.loads(out.stdout) == []
+
+
+@pytest.fixture
+def captured_run(tmp_path, monkeypatch):
+    """Run `demo run` in tmp_path with subprocess.call captured instead of executed"""
+    calls = []
+
+    def call(command, env):
+        calls.append((command, env))
+        return 0
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(subprocess, "call", call)
+    return calls
+
+
+def test_bootstrap_reports_failed_build(tmp_path, monkeypatch, capsys):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "uv").write_text("#!/bin/sh\nexit 3\n")
+    (bin_dir / "uv").chmod(0o755)
+    (tmp_path / "uv.lock").write_text("version = 1\n")
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+
+    assert main(["bootstrap", "--lockfile", str(tmp_path / "uv.lock"),
+                 "--cache-dir", str(tmp_path / "cache")]) == 2
+    assert capsys.readouterr().err == "error: uv sync failed with exit code 3\n"
+
+
+def test_run_exports_selected_config(config, captured_run):
+    assert main(["--config", config, "run", "--no-sdk", "--no-tunnel"]) == 0
+    (_, env), = captured_run
+    assert env["BROWSERSTACK_CONFIG_FILE"] == config
+
+
+def test_run_exports_derived_config_for_a_shard(config, captured_run, tmp_path):
+    assert main(["--config", config, "run", "--no-sdk", "--no-tunnel", "--shard", "2/2"]) == 0
+    (_, env), = captured_run
+    assert env["BROWSERSTACK_CONFIG_FILE"] == str(tmp_path / "log" / "browserstack.2-of-2.yml")
+    assert [p.name for p in matrix.load_platforms(env["BROWSERSTACK_CONFIG_FILE"])] == [
+        "Windows 10 Edge latest"]
+
+
+def test_concurrent_shards_keep_separate_resource_files(config, captured_run, tmp_path):
+    (tmp_path / "log").mkdir()
+    (tmp_path / "log" / "resources.1-of-2.jsonl").write_text('{"worker": "shard 1"}\n')
+
+    assert main(["--config", config, "run", "--no-sdk", "--no-tunnel", "--shard", "2/2"]) == 0
+    assert main(["--config", config, "run", "--no-sdk", "--no-tunnel",
+                 "--resources-file", str(tmp_path / "mine.jsonl")]) == 0
+
+    assert [env["DEMO_RESOURCES_FILE"] for _, env in captured_run] == [
+        "log/resources.2-of-2.jsonl", str(tmp_path / "mine.jsonl")]
+    assert (tmp_path / "log" / "resources.1-of-2.jsonl").exists()
+
+
+def test_write_config_points_sessions_at_shared_tunnel(config, tmp_path):
+    out = str(tmp_path / "local.yml")
+    source = matrix.load_config(config)
+    source["browserStackLocalOptions"] = {"forceLocal": True}
+    matrix.write_config(source, matrix.platforms_from_config(source)[:1], out,
+                        local_identifier="demo-abc")
+
+    derived = matrix.load_config(out)
+    assert derived["browserstackLocal"] is True
+    assert derived["browserStackLocalOptions"] == {
+        "forceLocal": True, "localIdentifier": "demo-abc", "skipBinaryInitialisation": True}
+    assert derived["platforms"] == [source["platforms"][0]]
+
+
+class FakeTunnel:
+    released = False
+
+    def __init__(self, idle_timeout):
+        pass
+
+    def acquire(self):
+        from demo.tunnel import TunnelLease
+
+        return TunnelLease("demo-abc", 1234, reused=True, startup_seconds=3.0)
+
+    def release(self):
+        FakeTunnel.released = True
+
+
+def test_run_with_tunnel_writes_local_config_and_releases(config, captured_run, monkeypatch, capsys):
+    from demo import tunnel
+
+    monkeypatch.setattr(tunnel, "TunnelManager", FakeTunnel)
+    monkeypatch.setattr(FakeTunnel, "released", False)
+    assert main(["--config", config, "run", "--tunnel"]) == 0
+
+    (command, env), = captured_run
+    assert command[0] == "browserstack-sdk"
+    derived = matrix.load_config(env["BROWSERSTACK_CONFIG_FILE"])
+    assert derived["browserStackLocalOptions"]["localIdentifier"] == "demo-abc"
+    assert len(derived["platforms"]) == 3
+    assert FakeTunnel.released
+    assert "tunnel demo-abc reused" in capsys.readouterr().out
+
+
+class FailingTunnel(FakeTunnel):
+    def acquire(self):
+        from demo.tunnel import TunnelError
+
+        raise TunnelError("Tunnel failed to connect: Invalid key")
+
+
+def test_run_reports_tunnel_failure(config, captured_run, monkeypatch, capsys):
+    from demo import tunnel
+
+    monkeypatch.setattr(tunnel, "TunnelManager", FailingTunnel)
+    assert main(["--config", config, "run", "--tunnel"]) == 2
+
+    assert captured_run == []
+    assert capsys.readouterr().err == "error: Tunnel failed to connect: Invalid key\n"
@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pytest
+
+from demo import envcache
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "uv.lock").write_text("version = 1\n")
+    (tmp_path / ".python-version").write_text("3.13\n")
+    return tmp_path
+
+
+class FakeBuilder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, env_path, project_dir):
+        self.calls.append(env_path)
+        os.makedirs(os.path.join(env_path, "bin"))
+        os.symlink(sys.executable, envcache.env_python(env_path))
+
+
+def test_miss_then_hit(project, tmp_path):
+    build = FakeBuilder()
+    lockfile = str(project / "uv.lock")
+    cache = str(tmp_path / "cache")
+
+    first = envcache.bootstrap(lockfile, cache_dir=cache, build=build)
+    second = envcache.bootstrap(lockfile, cache_dir=cache, build=build)
+
+    assert (first.hit, second.hit) == (False, True)
+    assert first.path == second.path
+    assert len(build.calls) == 1
+    assert "env cache hit" in second.summary()
+
+
+def test_lockfile_change_changes_key(project, tmp_path):
+    lockfile = str(project / "uv.lock")
+    before = envcache.cache_key(lockfile)
+    (project / "uv.lock").write_text("version = 2\n")
+    assert envcache.cache_key(lockfile) != before
+
+
+def test_incomplete_environment_is_rebuilt(project, tmp_path):
+    build = FakeBuilder()
+    lockfile = str(project / "uv.lock")
+    cache = tmp_path / "cache"
+    leftover = cache / envcache.cache_key(lockfile, str(project / ".python-version"))
+    (leftover / "bin").mkdir(parents=True)
+
+    result = envcache.bootstrap(lockfile, cache_dir=str(cache), build=build)
+
+    assert not result.hit
+    assert build.calls == [str(leftover)]
+
+
+def test_environment_with_missing_interpreter_is_rebuilt(project, tmp_path):
+    build = FakeBuilder()
+    lockfile = str(project / "uv.lock")
+    cache = str(tmp_path / "cache")
+    first = envcache.bootstrap(lockfile, cache_dir=cache, build=build)
+    # What a patch upgrade of the interpreter uv picked leaves behind
+    os.unlink(envcache.env_python(first.path))
+    os.symlink(str(tmp_path / "python3.13.0"), envcache.env_python(first.path))
+
+    second = envcache.bootstrap(lockfile, cache_dir=cache, build=build)
+
+    assert not second.hit
+    assert len(build.calls) == 2
+    assert envcache.usable(second.path)
+
+
+def test_link_points_at_cached_environment(project, tmp_path):
+    link = str(project / ".venv")
+    result = envcache.bootstrap(str(project / "uv.lock"), cache_dir=str(tmp_path / "cache"),
+                                link=link, build=FakeBuilder())
+    assert os.readlink(link) == result.path
+
+
+def test_prune_keeps_most_recent(tmp_path):
+    cache = tmp_path / "cache"
+    for i, name in enumerate(["old", "mid", "new"]):
+        (cache / name).mkdir(parents=True)
+        os.utime(cache / name, (i, i))
+
+    removed = envcache.prune(str(cache), keep=1)
+
+    assert sorted(os.path.basename(p) for p in removed) == ["mid", "old"]
+    assert (cache / "new").is_dir()
+
+
+def test_prune_removes_lock_files(project, tmp_path):
+    cache = tmp_path / "cache"
+    lockfile = str(project / "uv.lock")
+    old = envcache.bootstrap(lockfile, cache_dir=str(cache), build=FakeBuilder())
+    os.utime(old.path, (0, 0))
+    (project / "uv.lock").write_text("version = 2\n")
+    new = envcache.bootstrap(lockfile, cache_dir=str(cache), build=FakeBuilder())
+    (cache / "orphan.lock").write_text("")
+
+    removed = envcache.prune(str(cache), keep=1)
+
+    assert removed == [old.path]
+    key = os.path.basename(new.path)
+    assert sorted(os.listdir(cache)) == [key, key + ".lock"]
+
+
+def test_prune_skips_environment_a_run_is_using(project, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    result = envcache.bootstrap(str(project / "uv.lock"), cache_dir=str(cache), build=FakeBuilder())
+    monkeypatch.setattr(envcache.sys, "prefix", result.path)
+
+    with envcache.using_current_env():
+        assert envcache.prune(str(cache), keep=0) == []
+    assert envcache.prune(str(cache), keep=0) == [result.path]
+    assert os.listdir(cache) == []
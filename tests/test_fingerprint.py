@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from demo.fingerprint import FingerprintCache, FingerprintVerifier
+
+
+class PageDriver:
+    """Only answers the fingerprint script; any other browser call fails the test"""
+
+    def __init__(self, outline):
+        self.outline = outline
+        self.scripts = 0
+
+    def run_script(self, script, *args):
+        self.scripts += 1
+        if self.outline is None:
+            return None
+        _, known = args
+        fingerprint = str(hash(tuple(self.outline)))
+        return {"hash": fingerprint, "nodes": len(self.outline),
+                "outline": None if fingerprint in known else list(self.outline)}
+
+
+GOOD = ["div class=\"shelf-container\"", "  img alt=\"Galaxy S20+\""]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FingerprintCache(str(tmp_path / "fingerprints.json"))
+
+
+@pytest.fixture
+def fingerprint_verifier(cache, tmp_path):
+    return FingerprintVerifier(cache, "Windows 10 Edge latest", str(tmp_path / "diffs"),
+                               poll_interval=0)
+
+
+def test_first_run_verifies_fully_and_learns(fingerprint_verifier, cache):
+    calls = []
+    skipped = fingerprint_verifier.verify(PageDriver(GOOD), "favourites", ".shelf-container", 5,
+                                          lambda: calls.append("full"))
+
+    assert not skipped and calls == ["full"]
+    assert cache.get("Windows 10 Edge latest", "favourites")["outline"] == GOOD
+
+
+def test_known_good_state_skips_full_checks_in_one_round_trip(fingerprint_verifier):
+    fingerprint_verifier.verify(PageDriver(GOOD), "favourites", ".shelf-container", 5, lambda: None)
+
+    def fail():
+        raise AssertionError("full verification should have been skipped")
+
+    driver = PageDriver(GOOD)
+    assert fingerprint_verifier.verify(driver, "favourites", ".shelf-container", 5, fail)
+    assert (fingerprint_verifier.hits, fingerprint_verifier.misses) == (1, 1)
+    # The fingerprint poll is the region wait: nothing else touches the browser
+    assert driver.scripts == 1
+
+
+def test_state_seen_before_full_checks_is_not_learned(fingerprint_verifier, cache):
+    loading = ["div class=\"shelf-container\"", "  div class=\"spinner\""]
+    driver = PageDriver(loading)
+
+    def full():
+        driver.outline = GOOD  # what the full checks waited for
+
+    fingerprint_verifier.verify(driver, "favourites", ".shelf-container", 5, full)
+
+    assert cache.get("Windows 10 Edge latest", "favourites")["outline"] == GOOD
+    assert driver.scripts == 3  # two polls to see the page hold still, one to learn
+
+
+def test_region_that_never_appears_times_out(fingerprint_verifier):
+    with pytest.raises(TimeoutError, match=".shelf-container"):
+        fingerprint_verifier.verify(PageDriver(None), "favourites", ".shelf-container", 0.01,
+                                    lambda: None)
+
+
+def test_mismatch_falls_back_and_records_diff(fingerprint_verifier, tmp_path):
+    fingerprint_verifier.verify(PageDriver(GOOD), "favourites", ".shelf-container", 5, lambda: None)
+    changed = GOOD[:1] + ["  p \"Your favourites list is empty\""]
+    calls = []
+
+    assert not fingerprint_verifier.verify(PageDriver(changed), "favourites", ".shelf-container", 5,
+                                           lambda: calls.append("full"))
+
+    assert calls == ["full"]
+    [diff] = os.listdir(tmp_path / "diffs")
+    content = (tmp_path / "diffs" / diff).read_text()
+    assert '-  img alt="Galaxy S20+"' in content
+    assert '+  p "Your favourites list is empty"' in content
+
+
+def test_failed_full_check_is_not_learned(fingerprint_verifier, cache):
+    def fail():
+        raise AssertionError("not displayed")
+
+    with pytest.raises(AssertionError):
+        fingerprint_verifier.verify(PageDriver(GOOD), "favourites", ".shelf-container", 5, fail)
+    assert cache.get("Windows 10 Edge latest", "favourites")["hashes"] == []
+
+
+def test_cache_persists_learned_fingerprints(tmp_path):
+    path = str(tmp_path / "fingerprints.json")
+    cache = FingerprintCache(path, keep=2)
+    for fingerprint in ["aa", "bb", "cc"]:
+        cache.learn("edge", "login", fingerprint, ["div"])
+    cache.save()
+
+    assert FingerprintCache(path).get("edge", "login") == {"hashes": ["bb", "cc"], "outline": ["div"]}
@@ -0,0 +1,121 @@
+import pytest
+
+from demo.backends import Driver
+from demo.flow import FlowConfig, FlowError, run_flow
+
+
+class FakeDriver(Driver):
+    """In-memory driver recording the flow's calls; `missing` locators time out"""
+    name = "fake"
+
+    def __init__(self, username_matches=3, missing=(), visible=True):
+        self.calls = []
+        self.username_matches = username_matches
+        self.missing = set(missing)
+        self.visible = visible
+
+    def _check(self, locator):
+        if locator[1] in self.missing:
+            raise TimeoutError(f"Timed out waiting for {locator}")
+
+    def open(self, url, timeout):
+        self.calls.append(("open", url))
+
+    def click(self, locator, timeout):
+        self._check(locator)
+        self.calls.append(("click", locator[1]))
+
+    def click_nth(self, locator, index, timeout):
+        self._check(locator)
+        self.calls.append(("click_nth", locator[1], index))
+
+    def count(self, locator, timeout):
+        return self.username_matches
+
+    def is_visible(self, locator, timeout):
+        self._check(locator)
+        return self.visible
+
+    def texts(self, locator):
+        return []
+
+    def run_script(self, script, *args):
+        return None
+
+    def quit(self):
+        pass
+
+    def _screenshot(self, path):
+        pass
+
+
+def test_flow_runs_steps_in_order():
+    driver = FakeDriver()
+    durations = run_flow(driver, FlowConfig(URL="http://localhost/"))
+
+    assert list(durations) == ["login", "filter", "favourite", "verify"]
+    assert driver.calls[0] == ("open", "http://localhost/")
+    assert ("click_nth", "//div[contains(text(),'Select Username')]", 2) in driver.calls
+    assert ("click", "//*[text()='demouser']") in driver.calls
+    assert ("click", "[id='11'] button[aria-label='delete']") in driver.calls
+    assert driver.calls[-1] == ("click", "//a[normalize-space()='Favourites']")
+
+
+def test_single_username_placeholder_clicks_first():
+    driver = FakeDriver(username_matches=1)
+    run_flow(driver, FlowConfig())
+    assert ("click_nth", "//div[contains(text(),'Select Username')]", 0) in driver.calls
+
+
+def test_timeout_is_reported_with_step():
+    driver = FakeDriver(missing={"//*[text()='Samsung']"})
+    with pytest.raises(FlowError) as excinfo:
+        run_flow(driver, FlowConfig())
+    assert excinfo.value.step == "filter"
+
+
+def test_hidden_product_fails_verification():
+    with pytest.raises(FlowError, match="Galaxy S20\\+ image is not displayed"):
+        run_flow(FakeDriver(visible=False), FlowConfig())
+
+
+def test_per_step_timeouts():
+    seen = {}
+
+    class RecordingDriver(FakeDriver):
+        def click(self, locator, timeout):
+            seen.setdefault(locator[1], timeout)
+            super().click(locator, timeout)
+
+    run_flow(RecordingDriver(), FlowConfig(), timeouts={"login": 7, "filter": 3, "favourite": 4, "verify": 5}.get)
+
+    assert seen["//a[normalize-space()='Sign In']"] == 7
+    assert seen["//*[text()='Samsung']"] == 3
+    assert seen["//a[normalize-space()='Favourites']"] == 5
+
+
+class SlowLoadingWebDriver:
+    """Selenium WebDriver stand-in whose page load never finishes in time"""
+
+    def __init__(self):
+        self.page_load_timeouts = []
+
+    def set_page_load_timeout(self, timeout):
+        self.page_load_timeouts.append(timeout)
+
+    def get(self, url):
+        from selenium.common.exceptions import TimeoutException
+
+        raise TimeoutException("timeout: Timed out receiving message from renderer")
+
+
+def test_page_load_timeout_is_bounded_and_reported_with_step():
+    from demo.backends.selenium_backend import SeleniumDriver
+
+    webdriver = SlowLoadingWebDriver()
+    with pytest.raises(FlowError) as excinfo:
+        run_flow(SeleniumDriver(webdriver), FlowConfig(), timeouts={"login": 7}.get)
+
+    assert excinfo.value.step == "login"
+    assert isinstance(excinfo.value.__cause__, TimeoutError)
+    assert webdriver.page_load_timeouts == [7]
@@ -0,0 +1,126 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from demo import resources
+from demo.resources import HeavyOperationLimiter, ResourceSnapshot, WorkerAccounting, summarise
+
+
+class Element:
+    pass
+
+
+def test_snapshot_counts_sockets_and_live_elements():
+    resources.reset_peak()
+    before = ResourceSnapshot.take()
+    sock = socket.socket()
+    element = resources.track_element(Element())
+    during = ResourceSnapshot.take()
+    sock.close()
+    del element
+    after = ResourceSnapshot.take()
+
+    assert during.sockets == before.sockets + 1
+    assert during.live_elements == before.live_elements + 1
+    assert (after.sockets, after.live_elements) == (before.sockets, before.live_elements)
+    assert after.peak_live_elements == before.live_elements + 1
+    assert during.rss_bytes > 0
+
+
+def run_concurrently(limiter, workers=4):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def heavy():
+        with limiter.slot():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=heavy) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return peak[0]
+
+
+def test_lean_mode_caps_heavy_operations(tmp_path, monkeypatch):
+    monkeypatch.setenv(resources.LEAN_ENV_VAR, "1")
+    limiter = HeavyOperationLimiter(limit=1, slot_dir=str(tmp_path), poll_interval=0.01)
+
+    assert run_concurrently(limiter) == 1
+    assert limiter.count == 4
+    assert limiter.wait_seconds > 0
+
+
+def test_heavy_operations_unlimited_outside_lean_mode(tmp_path, monkeypatch):
+    monkeypatch.delenv(resources.LEAN_ENV_VAR, raising=False)
+    limiter = HeavyOperationLimiter(limit=1, slot_dir=str(tmp_path))
+    assert run_concurrently(limiter) > 1
+
+
+def test_worker_accounting_is_summarised(tmp_path):
+    path = str(tmp_path / "resources.jsonl")
+    accounting = WorkerAccounting("Windows 10 Edge latest#1", path)
+    accounting.start()
+    elements = [resources.track_element(Element()) for _ in range(24)]
+    del elements  # dropped long before the worker finishes
+    record = accounting.finish()
+
+    assert record["worker"] == "Windows 10 Edge latest#1"
+    [line] = summarise(path)
+    assert line.startswith("Windows 10 Edge latest#1: rss ")
+    assert "live elements 0 (peak 24)" in line
+
+
+@pytest.fixture(autouse=True)
+def clear_live_elements():
+    yield
+    resources.LIVE_ELEMENTS.clear()
+    resources.reset_peak()
+
+
+class ScriptOnlyWebDriver:
+    """Answers the lean-mode scripts; looking up WebElements fails the test"""
+
+    def __init__(self, matches):
+        self.matches = matches
+
+    def execute_script(self, script, strategy, value, *args):
+        if script.endswith("return nodes.length;"):
+            return len(self.matches)
+        if script.endswith("return nodes[arguments[2]] || null;"):
+            return self.matches[args[0]] if args[0] < len(self.matches) else None
+        raise AssertionError(f"unexpected script {script!r}")
+
+    def find_elements(self, *args):
+        raise AssertionError("lean mode materialised a WebElement per match")
+
+    find_element = find_elements
+
+
+class ClickableElement:
+    clicked = False
+
+    def click(self):
+        self.clicked = True
+
+
+def test_lean_selenium_counts_and_clicks_without_element_lists(monkeypatch):
+    from demo.backends import css
+    from demo.backends.selenium_backend import SeleniumDriver
+
+    monkeypatch.setenv(resources.LEAN_ENV_VAR, "1")
+    items = [ClickableElement() for _ in range(3)]
+    driver = SeleniumDriver(ScriptOnlyWebDriver(items), poll_frequency=0.01)
+
+    assert driver.count(css(".shelf-item"), timeout=1) == 3
+    driver.click_nth(css(".shelf-item"), 2, timeout=1)
+    assert [item.clicked for item in items] == [False, False, True]
+    with pytest.raises(TimeoutError):
+        driver.click_nth(css(".shelf-item"), 5, timeout=0.05)
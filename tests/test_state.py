@@ -0,0 +1,40 @@
+import threading
+
+from demo.state import merge_json, read_json, user_cache_dir
+
+
+def test_merge_keeps_every_concurrent_writer(tmp_path):
+    path = str(tmp_path / "state" / "shared.json")
+    start = threading.Barrier(8)
+
+    def writer(name):
+        start.wait()
+        merge_json(path, lambda data: data.setdefault("writers", []).append(name))
+
+    threads = [threading.Thread(target=writer, args=(f"worker-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(read_json(path)["writers"]) == sorted(f"worker-{i}" for i in range(8))
+
+
+def test_merge_returns_what_was_written(tmp_path):
+    path = str(tmp_path / "shared.json")
+    merge_json(path, lambda data: data.update(a=1))
+    assert merge_json(path, lambda data: data.update(b=2)) == {"a": 1, "b": 2} == read_json(path)
+
+
+def test_unreadable_state_reads_as_empty(tmp_path):
+    (tmp_path / "broken.json").write_text("{")
+    assert read_json(str(tmp_path / "broken.json")) == {}
+    assert read_json(str(tmp_path / "missing.json")) == {}
+
+
+def test_cache_dir_override_and_xdg(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv("DEMO_TEST_DIR", raising=False)
+    assert user_cache_dir("demo-test", "DEMO_TEST_DIR") == str(tmp_path / "demo-test")
+    monkeypatch.setenv("DEMO_TEST_DIR", "/elsewhere")
+    assert user_cache_dir("demo-test", "DEMO_TEST_DIR") == "/elsewhere"
@@ -0,0 +1,85 @@
+import pytest
+
+from demo.timeouts import DurationHistory, TimeoutModel, TimeoutPolicy
+
+
+@pytest.fixture
+def history(tmp_path):
+    return DurationHistory(str(tmp_path / "durations.json"))
+
+
+def test_fallback_without_enough_samples(history):
+    history.record("Windows 10 Edge latest", "login", 2.0)
+    assert TimeoutModel(history).timeout("Windows 10 Edge latest", "login") == TimeoutPolicy.FALLBACK
+
+
+def test_fast_platform_gets_short_timeout_slow_platform_headroom(history):
+    for i in range(20):
+        history.record("desktop", "login", 4.0 + i * 0.1)
+        history.record("mobile", "login", 50.0 + i)
+    model = TimeoutModel(history)
+
+    assert model.timeout("desktop", "login") == pytest.approx(5.9 * 1.5, abs=0.2)
+    assert model.timeout("mobile", "login") == TimeoutPolicy.CEILING
+
+
+def test_floor_applies(history):
+    for _ in range(10):
+        history.record("desktop", "filter", 0.2)
+    assert TimeoutModel(history).timeout("desktop", "filter") == TimeoutPolicy.FLOOR
+
+
+def test_window_keeps_recent_samples(history):
+    history.window = 3
+    for seconds in range(5):
+        history.record("desktop", "verify", seconds)
+    assert history.get("desktop", "verify") == [2, 3, 4]
+
+
+def test_recovers_after_the_site_slows_down(history):
+    model = TimeoutModel(history)
+    for _ in range(20):
+        history.record("desktop", "login", 4.0)
+    assert model.timeout("desktop", "login") == 6.0
+
+    # The step now takes 7s: the learned 6s timeout is hit once...
+    model.record_timeout("desktop", "login")
+    assert history.get("desktop", "login") == [4.0] * 20
+    # ...so the next run waits the fallback and measures the new duration
+    assert model.timeout("desktop", "login") == TimeoutPolicy.FALLBACK
+    history.record("desktop", "login", 7.0)
+
+    # From then on the timeout covers the new level without another failure
+    for _ in range(10):
+        assert model.timeout("desktop", "login") >= 7.0 * TimeoutPolicy.MARGIN
+        history.record("desktop", "login", 7.0)
+
+
+def test_slow_platform_retries_with_more_than_its_learned_timeout(history):
+    model = TimeoutModel(history)
+    for _ in range(20):
+        history.record("mobile", "login", 58.0)
+    assert model.timeout("mobile", "login") == 87.0
+
+    # A transient 87s timeout must not drop the next run to the 60s fallback,
+    # where a 62s step would fail (and be recorded as timing out) every run
+    model.record_timeout("mobile", "login")
+    assert model.timeout("mobile", "login") == TimeoutPolicy.CEILING
+    model.record_timeout("mobile", "login")
+    assert model.timeout("mobile", "login") == TimeoutPolicy.CEILING
+
+    history.record("mobile", "login", 62.0)
+    assert model.timeout("mobile", "login") == TimeoutPolicy.CEILING
+
+
+def test_timeouts_are_persisted_as_censored_samples(tmp_path):
+    path = str(tmp_path / "durations.json")
+    history = DurationHistory(path)
+    history.record("desktop", "verify", 2.0)
+    history.record_timeout("desktop", "verify", 6.0)
+    history.save()
+
+    reloaded = DurationHistory(path)
+    assert reloaded.samples == {"desktop": {"verify": [2.0, -6.0]}}
+    assert reloaded.timed_out("desktop", "verify")
+    assert reloaded.get("desktop", "verify") == [2.0]
@@ -0,0 +1,225 @@
+import json
+import os
+import stat
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from demo import tunnel
+from demo.tunnel import TunnelError, TunnelManager, pid_alive
+
+STUB = textwrap.dedent("""\
+    #!{python}
+    # Stand-in for the BrowserStackLocal daemon interface
+    import json, os, subprocess, sys, time
+    args = sys.argv[1:]
+    action = args[args.index("-d") + 1]
+    with open(os.path.join(os.path.dirname(__file__), "calls.log"), "a") as fh:
+        fh.write(action + "\\n")
+    with open(os.path.join(os.path.dirname(__file__), "env.log"), "a") as fh:
+        fh.write(json.dumps(sorted(name for name in ("BUILD_ID", "JENKINS_NODE_COOKIE")
+                                   if name in os.environ)) + "\\n")
+    if action == "start":
+        if os.environ.get("STUB_TUNNEL_HANG"):
+            time.sleep(600)
+        if os.environ.get("STUB_TUNNEL_FAIL"):
+            print(json.dumps({{"state": "disconnected", "message": {{"message": "Invalid key"}}}}))
+            sys.exit(1)
+        time.sleep(0.2)
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(600)"],
+                                 stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.DEVNULL, start_new_session=True)
+        print(json.dumps({{"state": "connected", "pid": child.pid,
+                          "message": {{"message": "Connected"}}}}))
+    else:
+        print(json.dumps({{"state": "disconnected", "message": {{"message": "Disconnected"}}}}))
+""")
+
+
+@pytest.fixture
+def stub(tmp_path):
+    path = tmp_path / "BrowserStackLocal"
+    path.write_text(STUB.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return path
+
+
+def calls(stub):
+    log = stub.parent / "calls.log"
+    return log.read_text().split() if log.exists() else []
+
+
+@pytest.fixture
+def manager(stub, tmp_path):
+    manager = TunnelManager(binary=str(stub), key="key", state_dir=str(tmp_path / "state"),
+                            idle_timeout=60, spawn_reaper=False, status_url=None)
+    yield manager
+    manager.stop()
+
+
+def test_second_acquire_reuses_tunnel(manager, stub):
+    first = manager.acquire(holder=os.getpid())
+    manager.release(holder=os.getpid())
+    second = manager.acquire(holder=os.getpid())
+
+    assert not first.reused and second.reused
+    assert second.local_identifier == first.local_identifier
+    assert first.startup_seconds >= 0.2
+    assert calls(stub) == ["start"]
+
+
+def test_dead_tunnel_is_restarted(manager, stub):
+    first = manager.acquire()
+    os.kill(first.pid, 9)
+    while pid_alive(first.pid):
+        time.sleep(0.01)
+
+    second = manager.acquire()
+
+    assert not second.reused
+    assert second.local_identifier != first.local_identifier
+
+
+def test_reap_respects_holders_and_idle_timeout(manager):
+    lease = manager.acquire()
+    assert not manager.reap()  # still held
+
+    manager.release()
+    assert not manager.reap()  # idle, but not for long enough
+
+    manager.idle_timeout = 0
+    assert manager.reap()
+    assert manager.status() is None
+    assert not pid_alive(lease.pid)
+
+
+def test_dead_holders_do_not_keep_tunnel(manager):
+    manager.acquire(holder=2 ** 22 + 12345)  # no such process
+    manager.idle_timeout = 0
+    assert manager.reap()
+
+
+def test_failed_start_raises(manager, monkeypatch):
+    monkeypatch.setenv("STUB_TUNNEL_FAIL", "1")
+    with pytest.raises(TunnelError, match="Invalid key"):
+        manager.acquire()
+
+
+def test_hung_start_raises(manager, monkeypatch):
+    monkeypatch.setenv("STUB_TUNNEL_HANG", "1")
+    monkeypatch.setattr(tunnel, "DAEMON_TIMEOUT", 0.5)
+    with pytest.raises(TunnelError, match="did not connect within 0.5s"):
+        manager.acquire()
+    # The state lock is free again for the next run
+    monkeypatch.delenv("STUB_TUNNEL_HANG")
+    assert not manager.acquire().reused
+
+
+@pytest.fixture
+def local_api():
+    """Fake BrowserStack Local list API reporting the identifiers in `running`"""
+    running = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps({"instances": [{"localIdentifier": name} for name in running]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield SimpleNamespace(
+        url=f"http://127.0.0.1:{server.server_port}/local/v1/list?auth_token={{key}}", running=running)
+    server.shutdown()
+    server.server_close()
+
+
+def test_disconnected_tunnel_is_restarted(manager, local_api):
+    manager.status_url = local_api.url
+    first = manager.acquire()
+    local_api.running.append(first.local_identifier)
+    assert manager.acquire().reused
+
+    # The daemon is still running, but BrowserStack no longer lists its connection
+    local_api.running.clear()
+    assert not manager.status()["healthy"]
+    second = manager.acquire()
+
+    assert not second.reused
+    assert second.local_identifier != first.local_identifier
+    assert not pid_alive(first.pid)
+
+
+def test_unreachable_api_falls_back_to_the_daemon_process(manager):
+    lease = manager.acquire()
+    manager.status_url = "http://127.0.0.1:9/local/v1/list?auth_token={key}"
+
+    assert manager.connected(manager.status()) is None
+    assert manager.acquire().reused and lease.pid == manager.status()["pid"]
+
+
+def test_status_reports_health(manager):
+    lease = manager.acquire()
+    state = manager.status()
+    assert state["healthy"] and state["pid"] == lease.pid
+    assert json.loads(open(manager.state_path).read())["local_identifier"] == lease.local_identifier
+
+
+def test_daemon_and_reaper_do_not_inherit_build_cookies(manager, stub, monkeypatch):
+    monkeypatch.setenv("BUILD_ID", "42")
+    monkeypatch.setenv("JENKINS_NODE_COOKIE", "cookie")
+    spawned = []
+    monkeypatch.setattr(tunnel, "subprocess", SimpleNamespace(
+        run=subprocess.run, DEVNULL=subprocess.DEVNULL,
+        Popen=lambda command, **kwargs: spawned.append(kwargs) or SimpleNamespace(pid=os.getpid())))
+
+    manager.spawn_reaper = True
+    manager.acquire()
+
+    assert (stub.parent / "env.log").read_text().splitlines() == ["[]"]
+    assert "BUILD_ID" not in spawned[0]["env"] and "JENKINS_NODE_COOKIE" not in spawned[0]["env"]
+
+
+def test_reaper_starts_with_the_tunnel(manager, monkeypatch):
+    spawned = []
+
+    def spawn():
+        spawned.append(time.time())
+        return os.getpid()  # a live "reaper"
+
+    monkeypatch.setattr(manager, "_spawn_reaper", spawn)
+    manager.spawn_reaper = True
+    manager.acquire(holder=os.getpid())
+    manager.acquire(holder=os.getppid())
+    manager.release(holder=os.getpid())
+
+    assert len(spawned) == 1  # one reaper, started on acquire and still waiting
+
+
+def test_waiting_reaper_stops_tunnel_after_holder_crashes(manager):
+    holder = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(600)"])
+    lease = manager.acquire(holder=holder.pid)
+    manager.idle_timeout = 0.5
+    reaped = []
+    reaper = threading.Thread(target=lambda: reaped.append(manager.reap(wait=True)))
+    reaper.start()
+
+    time.sleep(0.2)
+    assert reaper.is_alive()  # still held
+    holder.kill()  # the run crashes without releasing
+    holder.wait()
+    reaper.join(timeout=5)
+
+    assert reaped == [True]
+    assert not pid_alive(lease.pid)